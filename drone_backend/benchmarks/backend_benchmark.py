@@ -0,0 +1,102 @@
+"""
+Compare pose-model inference backends on recorded frames.
+
+Reports per-frame latency and how closely the nose/eye keypoints of each
+backend agree with the PyTorch reference.
+
+Usage (from drone_backend/):
+    python -m benchmarks.backend_benchmark --video clip.mp4 --frames 200
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from src.cv.inference_backends import BACKENDS, load_pose_model
+from src.cv.quantization import compare_face_keypoints, face_keypoints
+
+
+def read_frames(video_path, max_frames):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open video: {video_path}")
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run_backend(model, frames, imgsz, warmup):
+    for frame in frames[:warmup]:
+        model(frame, verbose=False, conf=0.3, imgsz=imgsz)
+
+    latencies = []
+    outputs = []
+    for frame in frames:
+        start = time.perf_counter()
+        results = model(frame, verbose=False, conf=0.3, imgsz=imgsz)
+        latencies.append((time.perf_counter() - start) * 1000)
+        outputs.append(face_keypoints(results))
+    return np.array(latencies), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', required=True, help='Recorded video to replay')
+    parser.add_argument('--model', default='yolov8n-pose.pt')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    print(f"Loaded {len(frames)} frames from {args.video}")
+
+    report = {}
+    reference = None
+    for backend in args.backends:
+        try:
+            model = load_pose_model(args.model, backend=backend, imgsz=args.imgsz, cache_dir=args.cache_dir)
+        except Exception as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+
+        latencies, outputs = run_backend(model, frames, args.imgsz, args.warmup)
+        entry = {
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'fps': float(1000 / latencies.mean()),
+        }
+        if reference is None:
+            reference = outputs
+            entry['reference'] = True
+        else:
+            entry.update(compare_face_keypoints(reference, outputs))
+        report[backend] = entry
+
+    print(f"\n{'backend':<10} {'mean ms':>8} {'p95 ms':>8} {'fps':>7} {'kp err px':>10} {'det agree':>10}")
+    for backend, entry in report.items():
+        err = entry.get('mean_keypoint_error_px')
+        agree = entry.get('detection_agreement')
+        print(f"{backend:<10} {entry['mean_ms']:>8.1f} {entry['p95_ms']:>8.1f} {entry['fps']:>7.1f} "
+              f"{'-' if err is None else f'{err:.2f}':>10} {'-' if agree is None else f'{agree:.0%}':>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Keypoint post-processing versus the old per-person scalar code.
+
+Uses synthetic (n, 17, 3) keypoints, so no model or camera is needed. With
+torch installed they are held in a tensor on --device, so both paths pay the
+real device-to-host copies: the legacy path one .cpu().numpy() per person,
+as run_head_detection used to, the new path one for the whole result. Without
+torch a NumPy copy stands in for the transfer. head_estimates loops over
+people in Python up to SCALAR_MAX_PEOPLE and uses one NumPy pass above that;
+both paths are timed on every row, and 'used' says which one it picks.
+
+Usage (from drone_backend/):
+    python -m benchmarks.keypoint_benchmark --people 1 4 16 --iterations 2000
+    python -m benchmarks.keypoint_benchmark --device cuda
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.cv.keypoints import SCALAR_MAX_PEOPLE, _scalar_head_estimates, _vectorized_head_estimates
+
+
+def synthetic_keypoints(people, seed=0):
+    rng = np.random.default_rng(seed)
+    data = np.zeros((people, 17, 3), dtype=np.float32)
+    centers = rng.uniform(100, 540, size=(people, 2))
+    offsets = np.array([[0, 0], [-15, -10], [15, -10], [-30, -5], [30, -5]], dtype=np.float32)
+    data[:, :5, :2] = centers[:, None, :] + offsets + rng.normal(0, 1, size=(people, 5, 2))
+    data[:, 5:, :2] = centers[:, None, :] + rng.uniform(-80, 80, size=(people, 12, 2))
+    data[:, :, 2] = rng.uniform(0.3, 1.0, size=(people, 17))
+    return data
+
+
+def to_device(data, device):
+    """Keypoints as a torch tensor on device, or the NumPy array itself without torch"""
+    try:
+        import torch
+    except ImportError:
+        return data
+    return torch.from_numpy(data).to(device)
+
+
+def to_host(values):
+    if isinstance(values, np.ndarray):
+        return np.array(values)  # stands in for the transfer
+    return values.cpu().numpy()
+
+
+def legacy_heads(data):
+    """The previous scalar head estimate, applied to each person in turn"""
+    heads = []
+    for i in range(len(data)):
+        keypoints = to_host(data[i, :, :2])  # one copy per person, like keypoints.xy[i].cpu().numpy()
+        nose = keypoints[0]
+        left_eye = keypoints[1]
+        right_eye = keypoints[2]
+        if nose[0] > 0 and nose[1] > 0:
+            if left_eye[0] > 0 and right_eye[0] > 0:
+                eye_distance = np.sqrt((right_eye[0] - left_eye[0])**2 +
+                                       (right_eye[1] - left_eye[1])**2)
+                head_size = int(eye_distance * 2.0)
+            else:
+                head_size = 100
+            heads.append((int(nose[0]), int(nose[1]), head_size))
+    return heads
+
+
+def scalar_heads(data):
+    """One copy for every person, then the per-person path of head_estimates"""
+    return _scalar_head_estimates(to_host(data), 0.5)
+
+
+def vectorized_heads(data):
+    """One copy for every person, then the NumPy path of head_estimates"""
+    return _vectorized_head_estimates(to_host(data), 0.5)
+
+
+def time_call(fn, data, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(data)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--people', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--device', default='cpu', help='Torch device holding the keypoints')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    rows = []
+    transfer = 'numpy stand-in' if isinstance(to_device(synthetic_keypoints(1), args.device), np.ndarray) \
+        else f'torch {args.device}'
+    print(f"Keypoints held as: {transfer}")
+    print(f"{'people':>6} {'legacy us':>10} {'scalar us':>10} {'vectorized us':>14} {'used':>10} {'speedup':>8}")
+    for people in args.people:
+        data = to_device(synthetic_keypoints(people), args.device)
+        legacy_us = time_call(legacy_heads, data, args.iterations)
+        scalar_us = time_call(scalar_heads, data, args.iterations)
+        vectorized_us = time_call(vectorized_heads, data, args.iterations)
+        used = 'scalar' if people <= SCALAR_MAX_PEOPLE else 'vectorized'
+        current_us = scalar_us if used == 'scalar' else vectorized_us
+        rows.append({'people': people, 'transfer': transfer, 'legacy_us': legacy_us, 'scalar_us': scalar_us,
+                     'vectorized_us': vectorized_us, 'used': used})
+        print(f"{people:>6} {legacy_us:>10.1f} {scalar_us:>10.1f} {vectorized_us:>14.1f} {used:>10} "
+              f"{legacy_us / current_us:>7.1f}x")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
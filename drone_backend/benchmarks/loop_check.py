@@ -0,0 +1,69 @@
+"""
+Check that the tracking loop survives frames with nobody in them.
+
+Runs HeadDetector.run_head_detection headless on synthetic frames where
+every few frames is blank, so the model finds no person and the tracker is
+updated with an empty detection set. The sequential loop must reach a
+control update for every frame. The pipeline drops frames by design, so
+there the frames are paced in real time and the check is that the source
+was read to the end. Exits non-zero if the loop stopped early.
+
+Usage (from drone_backend/):
+    python -m benchmarks.loop_check
+    python -m benchmarks.loop_check --frames 60 --blank-every 2 --pipeline
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from src.cv.frame_source import SyntheticFrameSource
+from src.cv.head_detection import HeadDetector
+
+
+class GappySyntheticFrameSource(SyntheticFrameSource):
+    """Synthetic frames with a blank one every blank_every frames"""
+
+    def __init__(self, blank_every=3, **kwargs):
+        super().__init__(**kwargs)
+        self.blank_every = blank_every
+
+    def _read_image(self):
+        image = super()._read_image()
+        if self.seq % self.blank_every == 0:
+            return np.zeros_like(image)
+        return image
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yolov8n-pose.pt')
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--blank-every', type=int, default=3, help='Every Nth frame is blank')
+    parser.add_argument('--pipeline', action='store_true', help='Use the threaded pipeline instead of the loop')
+    parser.add_argument('--fps', type=float, default=15.0, help='Pacing for --pipeline')
+    args = parser.parse_args()
+
+    detector = HeadDetector(model_path=args.model, backend=args.backend, pipeline_mode=args.pipeline)
+    source = GappySyntheticFrameSource(blank_every=args.blank_every, fps=args.fps, realtime=args.pipeline,
+                                       max_frames=args.frames)
+    if not source.open():
+        raise SystemExit('Could not open synthetic source')
+
+    controlled = []
+    detector.run_head_detection(control_callback=lambda values: controlled.append(values['face_detected']),
+                                frame_source=source, headless=True)
+
+    print(f"{source.seq}/{args.frames} frames read, {len(controlled)} reached control, "
+          f"{sum(controlled)} with a face")
+    stopped_early = source.seq < args.frames if args.pipeline else len(controlled) < args.frames
+    if stopped_early:
+        print('FAIL: the loop stopped early')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Aggregate pose-model FPS versus number of sources on one BatchInferenceService.
+
+Every simulated source replays the same recorded clip in its own thread and
+calls its service client in a loop, the way a HeadDetector would. Runs the
+sweep once batched and once with max_batch=1 for comparison.
+
+Usage (from drone_backend/):
+    python -m benchmarks.multistream_benchmark --video clip.mp4 --max-sources 4
+"""
+
+import argparse
+import json
+import threading
+import time
+
+from benchmarks.backend_benchmark import read_frames
+from src.cv.inference_backends import BACKENDS, load_pose_model
+from src.cv.inference_service import BatchInferenceService
+
+
+def run_sources(model, frames, sources, max_batch, max_wait, duration, imgsz):
+    service = BatchInferenceService(model, max_batch=max_batch, max_wait=max_wait)
+    service.start()
+    stop = threading.Event()
+    counts = [0] * sources
+
+    def worker(index):
+        client = service.client(f'source-{index}')
+        i = index
+        while not stop.is_set():
+            client(frames[i % len(frames)], imgsz=imgsz)
+            counts[index] += 1
+            i += 1
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(sources)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    stats = service.get_stats()
+    service.stop()
+
+    return {
+        'sources': sources,
+        'max_batch': max_batch,
+        'aggregate_fps': round(sum(counts) / duration, 1),
+        'per_source_fps': [round(c / duration, 1) for c in counts],
+        'avg_batch_size': stats['avg_batch_size'],
+        'avg_batch_ms': stats['avg_batch_ms'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', required=True)
+    parser.add_argument('--model', default='yolov8n-pose.pt')
+    parser.add_argument('--backend', default='pytorch', choices=BACKENDS)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--max-sources', type=int, default=4)
+    parser.add_argument('--max-wait', type=float, default=0.02)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per configuration')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, 100)
+    model = load_pose_model(args.model, backend=args.backend, imgsz=args.imgsz)
+    model([frames[0]], verbose=False, imgsz=args.imgsz)  # warm-up
+
+    rows = []
+    for sources in range(1, args.max_sources + 1):
+        for max_batch in sorted({1, sources}):
+            row = run_sources(model, frames, sources, max_batch, args.max_wait, args.duration, args.imgsz)
+            rows.append(row)
+            print(f"sources={row['sources']} max_batch={row['max_batch']:<2} "
+                  f"aggregate={row['aggregate_fps']:>6.1f} fps  per-source={row['per_source_fps']}  "
+                  f"avg batch={row['avg_batch_size']} ({row['avg_batch_ms']} ms)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Replay recorded video through HeadDetector.run_head_detection.
+
+No drone and no display: frames come from the files, either as fast as the
+loop can take them or paced at the clip's own frame rate. Each stage
+(capture, inference, control, render) is timed per call, and the velocity
+commands set by drone_directions are recorded after every control update.
+Results go to a JSON file so runs can be compared across commits with
+--baseline. A clip the loop did not read to the end (an exception stopped
+it) is marked completed: false, is left out of baseline comparisons, and
+makes the script exit non-zero after the report is written.
+
+Usage (from drone_backend/):
+    python -m benchmarks.replay_benchmark clip1.mp4 clip2.mp4 --output replay.json
+    python -m benchmarks.replay_benchmark clip1.mp4 --realtime --pipeline --baseline replay.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import time
+
+import numpy as np
+
+from src.cv.frame_source import VideoFileFrameSource
+from src.cv.head_detection import HeadDetector
+
+STAGES = ('capture', 'inference', 'control', 'render')
+PERCENTILES = (50, 95, 99)
+
+
+def timed(fn, samples):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            samples.append((time.perf_counter() - started) * 1000)
+    return wrapper
+
+
+def latency_summary(samples):
+    if not samples:
+        return None
+    values = np.asarray(samples)
+    summary = {f'p{p}_ms': round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+    summary['mean_ms'] = round(float(values.mean()), 3)
+    summary['count'] = len(samples)
+    return summary
+
+
+def replay(detector, path, realtime, max_frames, render_overlay):
+    """Run one clip through run_head_detection and collect its metrics"""
+    detector.reset_tracking()
+    detector.overlay.is_watched = lambda: render_overlay
+    source = VideoFileFrameSource(path, realtime=realtime, max_frames=max_frames)
+    if not source.open():
+        raise SystemExit(f"Could not open video: {path}")
+
+    samples = {name: [] for name in STAGES}
+    velocities = []
+
+    def on_control(control_values):
+        velocities.append({
+            'index': len(velocities),
+            'face_detected': control_values['face_detected'],
+            'lr': detector.lr_velocity,
+            'fb': detector.fb_velocity,
+            'ud': detector.ud_velocity,
+            'yaw': detector.yaw_velocity,
+        })
+
+    # Wrap the per-stage methods on these instances; both loop modes call them through self.
+    # With --realtime the capture latency includes the wait for the next frame.
+    exhausted = []
+
+    def read_until_end(read=source.read):
+        frame = read()
+        if frame is None:
+            exhausted.append(True)
+        return frame
+
+    source.read = timed(read_until_end, samples['capture'])
+    detector._update_detection = timed(detector._update_detection, samples['inference'])
+    detector._apply_control = timed(detector._apply_control, samples['control'])
+    detector._render_frame = timed(detector._render_frame, samples['render'])
+
+    started = time.perf_counter()
+    try:
+        detector.run_head_detection(
+            control_callback=on_control,
+            frame_source=source,
+            headless=True,
+        )
+    finally:
+        for name in ('_update_detection', '_apply_control', '_render_frame'):
+            del detector.__dict__[name]
+    elapsed = time.perf_counter() - started
+
+    # A clip counts as replayed only if the loop read it to the end without an error;
+    # otherwise every figure below describes a truncated run
+    completed = bool(exhausted) and detector.last_error is None
+    captured = len(samples['capture']) - (1 if exhausted else 0)  # the last read hits end of file
+    controlled = len(velocities)
+    detected = sum(v['face_detected'] for v in velocities)
+    return {
+        'video': os.path.basename(path),
+        'video_fps': round(source.fps, 2),
+        'completed': completed,
+        'error': detector.last_error,
+        'frames_read': captured,
+        'frames_processed': controlled,
+        'seconds': round(elapsed, 3),
+        'fps': round(controlled / elapsed, 2) if elapsed else 0.0,
+        'detection_rate': round(detected / controlled, 4) if controlled else 0.0,
+        'stages': {name: latency_summary(values) for name, values in samples.items()},
+        'velocities': velocities,
+        'telemetry': detector.get_telemetry(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result, baseline=None):
+    print(f"\n{result['video']}: {result['frames_processed']} frames in {result['seconds']:.1f}s, "
+          f"{result['fps']:.1f} FPS, detection rate {result['detection_rate']:.1%}")
+    if not result['completed']:
+        print(f"  INCOMPLETE: replay stopped early ({result['error'] or 'source not read to the end'}); "
+              f"not comparable")
+        return
+    if baseline is not None and not baseline.get('completed', True):
+        print("  Baseline run was incomplete; skipping comparison")
+        baseline = None
+    if baseline is not None and baseline.get('fps'):
+        change = (result['fps'] - baseline['fps']) / baseline['fps']
+        print(f"  FPS vs baseline {baseline['fps']:.1f}: {change:+.1%}")
+    print(f"  {'stage':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name in STAGES:
+        stats = result['stages'][name]
+        if stats is None:
+            continue
+        line = f"  {name:<10} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        base = (baseline or {}).get('stages', {}).get(name)
+        if base:
+            line += f"   (baseline p95 {base['p95_ms']:.2f})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='+', help='Recorded video files to replay')
+    parser.add_argument('--model', default='yolov8n-pose.pt')
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--pipeline', action='store_true', help='Use the threaded pipeline instead of the loop')
+    parser.add_argument('--realtime', action='store_true', help='Pace frames at the video frame rate')
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--no-overlay', action='store_true', help='Skip overlay rendering, as with no viewers')
+    parser.add_argument('--roi', action='store_true', help='Enable ROI inference')
+    parser.add_argument('--adaptive-skip', action='store_true')
+    parser.add_argument('--motion-gate', action='store_true')
+    parser.add_argument('--optical-flow', action='store_true')
+    parser.add_argument('--baseline', help='Earlier JSON output to compare against')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    detector = HeadDetector(model_path=args.model, pipeline_mode=args.pipeline, backend=args.backend,
+                            imgsz=args.imgsz, roi_mode=args.roi, adaptive_skip=args.adaptive_skip,
+                            motion_gate=args.motion_gate, optical_flow=args.optical_flow)
+    detector.warmup()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r['video']: r for r in json.load(f)['results']}
+
+    results = []
+    for path in args.videos:
+        result = replay(detector, path, args.realtime, args.max_frames, not args.no_overlay)
+        results.append(result)
+        print_result(result, baseline.get(result['video']))
+
+    if args.output:
+        report = {
+            'revision': git_revision(),
+            'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    incomplete = [r['video'] for r in results if not r['completed']]
+    if incomplete:
+        raise SystemExit(f"Replay incomplete for: {', '.join(incomplete)}")
+
+
+if __name__ == '__main__':
+    main()
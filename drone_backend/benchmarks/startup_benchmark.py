@@ -0,0 +1,134 @@
+"""
+Import time and cold-start latency of the backend.
+
+Every measurement runs in a fresh interpreter so module caches do not hide
+import cost. Import rows also list which heavy modules ended up loaded, to
+catch a blueprint pulling torch or an API client back in at import time.
+The cold-start run loads the pose model and times the first inference
+against the steady state, with and without HeadDetector.warmup. It feeds a
+blank frame first and synthetic frames after, so the no-person path runs too.
+
+Usage (from drone_backend/):
+    python -m benchmarks.startup_benchmark --model yolov8n-pose.pt --imgsz 640 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('torch', 'ultralytics', 'google.genai', 'openai', 'onnxruntime', 'openvino')
+IMPORT_TARGETS = ('src.api', 'src.cv', 'src.llm', 'ultralytics', 'google.genai', 'openai')
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_COLD_START_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from src.cv.head_detection import HeadDetector
+import_seconds = time.perf_counter() - started
+import numpy as np
+
+started = time.perf_counter()
+detector = HeadDetector(model_path={model!r}, backend={backend!r}, imgsz={imgsz})
+load_seconds = time.perf_counter() - started
+
+warmup = detector.warmup({warmup}) if {warmup} else None
+
+# Synthetic frames, blank first: the empty-scene path is timed as well as the one with a target
+from src.cv.frame_source import SyntheticFrameSource
+source = SyntheticFrameSource(640, 480, realtime=False)
+source.open()
+frames = [np.zeros((480, 640, 3), dtype=np.uint8)] + [source.read().image for _ in range({frames} - 1)]
+geometry = detector._square_geometry(frames[0])
+latencies = []
+found = 0
+for frame in frames:
+    started = time.perf_counter()
+    found += detector._infer_target(frame, geometry) is not None
+    latencies.append((time.perf_counter() - started) * 1000)
+print(json.dumps({{
+    'frames': len(frames),
+    'frames_with_target': found,
+    'import_seconds': import_seconds,
+    'load_seconds': load_seconds,
+    'warmup': warmup,
+    'first_frame_ms': latencies[0],
+    'steady_ms': sorted(latencies[1:])[len(latencies[1:]) // 2] if len(latencies) > 1 else None,
+}}))
+"""
+
+
+def run_script(script):
+    """Run script in a fresh interpreter from drone_backend/; returns its JSON output or an error"""
+    proc = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return {'error': lines[-1] if lines else f'exit code {proc.returncode}'}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_imports(modules, repeats):
+    rows = []
+    for module in modules:
+        runs = [run_script(_IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)) for _ in range(repeats)]
+        errors = [r['error'] for r in runs if 'error' in r]
+        if errors:
+            rows.append({'module': module, 'error': errors[0]})
+            continue
+        seconds = sorted(r['seconds'] for r in runs)
+        rows.append({'module': module, 'seconds': seconds[len(seconds) // 2], 'loaded': runs[0]['loaded']})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yolov8n-pose.pt')
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--warmup', type=int, default=2, help='Warm-up passes for the warmed cold-start run')
+    parser.add_argument('--frames', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=3, help='Fresh interpreters per import measurement')
+    parser.add_argument('--skip-model', action='store_true', help='Only measure imports')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    report = {'imports': measure_imports(IMPORT_TARGETS, args.repeats), 'cold_start': {}}
+
+    print(f"{'module':<14} {'import s':>9}  heavy modules loaded")
+    for row in report['imports']:
+        if 'error' in row:
+            print(f"{row['module']:<14} {'-':>9}  {row['error']}")
+        else:
+            print(f"{row['module']:<14} {row['seconds']:>9.3f}  {', '.join(row['loaded']) or '-'}")
+
+    if not args.skip_model:
+        for label, warmup in (('cold', 0), ('warmed', args.warmup)):
+            script = _COLD_START_SCRIPT.format(model=args.model, backend=args.backend, imgsz=args.imgsz,
+                                               warmup=warmup, frames=args.frames)
+            report['cold_start'][label] = result = run_script(script)
+            if 'error' in result:
+                print(f"\n{label}: {result['error']}")
+                continue
+            print(f"\n{label}: import {result['import_seconds']:.2f}s, load {result['load_seconds']:.2f}s, "
+                  f"first frame {result['first_frame_ms']:.0f}ms, steady {result['steady_ms'] or 0:.0f}ms, "
+                  f"target in {result['frames_with_target']}/{result['frames']} frames")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
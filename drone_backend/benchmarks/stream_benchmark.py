@@ -0,0 +1,130 @@
+"""
+Compare MJPEG and H.264/fMP4 encoding of the tracking stream.
+
+Frames are loaded into memory first, from video files or the synthetic
+source, and center-cropped to the square the tracker streams. Each codec
+then encodes the same frames in this thread: MJPEG with every available
+JPEG backend at the stream's settings, H.264 through the same encoder as
+/api/video-h264.
+Reported per codec: encode latency percentiles, CPU seconds per frame, and
+bytes/s at the nominal stream frame rate. The MJPEG figure is per encoded
+variant; before encode-once streaming it was multiplied by the client count.
+
+Usage (from drone_backend/):
+    python -m benchmarks.stream_benchmark --frames 300
+    python -m benchmarks.stream_benchmark clip.mp4 --size 720 --crf 28 --output stream.json
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from src.cv.frame_source import SyntheticFrameSource, VideoFileFrameSource
+from src.utils.h264_stream import _Encoder, h264_available
+from src.utils.jpeg_encoder import available_encoders
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_frames(paths, count, size):
+    """Up to count square frames of side size, cycling through the sources"""
+    sources = [VideoFileFrameSource(p, realtime=False) for p in paths] or \
+        [SyntheticFrameSource(size, size, realtime=False)]
+    frames = []
+    for source in sources:
+        if not source.open():
+            raise SystemExit(f"Could not open {source.name}")
+        while len(frames) < count:
+            frame = source.read()
+            if frame is None:
+                break
+            h, w = frame.image.shape[:2]
+            side = min(h, w)
+            crop = frame.image[(h - side) // 2:(h + side) // 2, (w - side) // 2:(w + side) // 2]
+            frames.append(np.ascontiguousarray(cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)))
+        source.release()
+    if not frames:
+        raise SystemExit('No frames read')
+    return frames
+
+
+def summarize(name, latencies, cpu_seconds, total_bytes, frames, fps):
+    values = np.asarray(latencies)
+    summary = {f'p{p}_ms': round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+    summary.update({
+        'codec': name,
+        'frames': frames,
+        'mean_ms': round(float(values.mean()), 3),
+        'cpu_ms_per_frame': round(cpu_seconds * 1000 / frames, 3),
+        'bytes_per_frame': round(total_bytes / frames),
+        'kbytes_per_s': round(total_bytes / frames * fps / 1000, 1),
+    })
+    return summary
+
+
+def bench_mjpeg(encoder, frames, quality, fps):
+    latencies, total = [], 0
+    cpu_started = time.process_time()
+    for image in frames:
+        started = time.perf_counter()
+        data = encoder.encode(image, quality)
+        latencies.append((time.perf_counter() - started) * 1000)
+        total += len(data)
+    return summarize(f'mjpeg-{encoder.name}', latencies, time.process_time() - cpu_started, total, len(frames), fps)
+
+
+def bench_h264(frames, crf, fps):
+    h, w = frames[0].shape[:2]
+    encoder = _Encoder(w, h, fps, crf, gop=int(fps))
+    latencies, total = [], 0
+    cpu_started = time.process_time()
+    for i, image in enumerate(frames):
+        started = time.perf_counter()
+        fragments = encoder.encode(image, i / fps)
+        latencies.append((time.perf_counter() - started) * 1000)
+        total += sum(len(data) for data, _ in fragments)
+    cpu_seconds = time.process_time() - cpu_started
+    total += len(encoder.init_segment)
+    encoder.close()
+    return summarize('h264', latencies, cpu_seconds, total, len(frames), fps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='*', help='Video files to encode; synthetic frames if none')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--size', type=int, default=720, help='Square frame side, as streamed')
+    parser.add_argument('--fps', type=float, default=30.0, help='Nominal stream rate for bytes/s')
+    parser.add_argument('--quality', type=int, default=85, help='JPEG quality')
+    parser.add_argument('--subsampling', default='420', help='JPEG chroma subsampling: 444, 422 or 420')
+    parser.add_argument('--crf', type=int, default=23, help='x264 constant rate factor')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    frames = load_frames(args.videos, args.frames, args.size & ~1)
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}, cv2 threads {cv2.getNumThreads()}")
+
+    results = [bench_mjpeg(encoder, frames, args.quality, args.fps)
+               for encoder in available_encoders(args.subsampling)]
+    if h264_available():
+        results.append(bench_h264(frames, args.crf, args.fps))
+    else:
+        print('PyAV not installed (pip install av); skipping H.264')
+
+    print(f"\n  {'codec':<16} {'p50 ms':>8} {'p95 ms':>8} {'cpu ms/f':>9} {'bytes/f':>9} {'kB/s':>9}")
+    for r in results:
+        print(f"  {r['codec']:<16} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['cpu_ms_per_frame']:>9.2f} "
+              f"{r['bytes_per_frame']:>9} {r['kbytes_per_s']:>9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': {k: v for k, v in vars(args).items() if k != 'output'}, 'results': results},
+                      f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,24 @@
 from flask import Blueprint, jsonify, request, Response
-from src.utils import run_detection, generate_frames, current_drone_data, frame_lock, stop_flag
+from src.utils import run_detection, generate_frames, current_drone_data, drone_data_lock, stop_flag, get_tracking_stats, get_objects, get_targets, lock_target, unlock_target, generate_detections, generate_h264_segments
 import threading
 
+try:
+    from flask_sock import Sock
+except ImportError:  # optional: pip install flask-sock av
+    Sock = None
+
 cam_bp = Blueprint('cam', __name__)
+sock = Sock() if Sock is not None else None
 tracking_started = False
 
+def run_tracking():
+    """Tracking thread; clears tracking_started when the loop ends so the next request restarts it"""
+    global tracking_started
+    try:
+        run_detection()
+    finally:
+        tracking_started = False
+
 @cam_bp.route('/api/start-tracking', methods=['POST'])
 def start_tracking():
     """Start tracking endpoint"""
@@ -13,26 +27,85 @@ def start_tracking():
     if not tracking_started:
         stop_flag.clear()  # Ensure stop flag is cleared
         tracking_started = True
-        thread = threading.Thread(target=run_detection, daemon=True)
+        thread = threading.Thread(target=run_tracking, daemon=True)
         thread.start()
     
     return jsonify({'message': 'Tracking started'})
 
 @cam_bp.route('/api/video-tracking', methods=['GET'])
 def video_feed():
-    """Video streaming route - starts tracking and returns stream"""
+    """
+    Video streaming route - starts tracking and returns stream
+
+    Optional query parameters: fps (frame rate cap), max_size (longest side
+    in pixels), quality (JPEG quality 10-95) and auto=1 to adapt size and
+    quality to the client's connection.
+    """
     global tracking_started
 
     print(f"Active threads: {threading.active_count()}")  # Debug
     print(f"Tracking started: {tracking_started}") 
     
+    fps = request.args.get('fps', type=float)
+    max_size = request.args.get('max_size', type=int)
+    quality = request.args.get('quality', type=int)
+    auto = request.args.get('auto', '').lower() in ('1', 'true', 'yes')
+    if fps is not None and not 0 < fps <= 60:
+        return jsonify({'error': 'fps must be between 0 and 60'}), 400
+    if max_size is not None and max_size < 64:
+        return jsonify({'error': 'max_size must be at least 64'}), 400
+    if quality is not None and not 10 <= quality <= 95:
+        return jsonify({'error': 'quality must be between 10 and 95'}), 400
+
     if not tracking_started:
         stop_flag.clear()  # Ensure stop flag is cleared
         tracking_started = True
-        thread = threading.Thread(target=run_detection, daemon=True)
+        thread = threading.Thread(target=run_tracking, daemon=True)
         thread.start()
     
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(generate_frames(fps=fps, max_size=max_size, quality=quality, auto=auto),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+def video_h264(ws):
+    """
+    H.264 stream over WebSocket - starts tracking and sends binary fMP4
+
+    The first message is the init segment and every later one a fragment,
+    ready to append to a MediaSource SourceBuffer
+    ('video/mp4; codecs="avc1.42E01E"' or as reported by the init segment).
+    """
+    global tracking_started
+
+    segments = generate_h264_segments()
+    if segments is None:
+        ws.close(reason=1011, message='H.264 streaming needs PyAV (pip install av)')
+        return
+
+    if not tracking_started:
+        stop_flag.clear()  # Ensure stop flag is cleared
+        tracking_started = True
+        thread = threading.Thread(target=run_tracking, daemon=True)
+        thread.start()
+
+    try:
+        for segment in segments:
+            ws.send(segment)
+    finally:
+        # Unsubscribes right away instead of when the generator is collected
+        segments.close()
+
+if sock is not None:
+    # flask-sock's route decorator returns None, so register without rebinding video_h264
+    sock.route('/api/video-h264', bp=cam_bp)(video_h264)
+else:
+    @cam_bp.route('/api/video-h264', methods=['GET'])
+    def video_h264_unavailable():
+        return jsonify({'error': 'H.264 streaming needs flask-sock (pip install flask-sock av)'}), 501
+
+@cam_bp.route('/api/detections', methods=['GET'])
+def detections_feed():
+    """Server-sent events with the latest head detection, for client-side overlays"""
+    return Response(generate_detections(), mimetype='text/event-stream')
 
 @cam_bp.route('/api/stop-tracking', methods=['POST'])
 def stop_tracking():
@@ -48,8 +121,54 @@ def stop_tracking():
 
 @cam_bp.route('/api/logged-data', methods=['GET'])
 def get_logged_data():
-    global current_drone_data, frame_lock
-    with frame_lock:
+    global current_drone_data, drone_data_lock
+    with drone_data_lock:
         # Create a copy to avoid race conditions
         data_copy = current_drone_data.copy()
-    return jsonify(data_copy)
\ No newline at end of file
+    return jsonify(data_copy)
+
+@cam_bp.route('/api/tracking-stats', methods=['GET'])
+def tracking_stats():
+    """Per-stage throughput and queue-drop counters for the detection loop"""
+    stats = get_tracking_stats()
+    if stats is None:
+        return jsonify({'error': 'Tracking not started'}), 400
+    return jsonify(stats)
+
+@cam_bp.route('/api/objects', methods=['GET'])
+def objects():
+    """Latest general object detections from the shared camera loop"""
+    latest = get_objects()
+    if latest is None:
+        return jsonify({'error': 'Object detection not running or no results yet'}), 400
+    return jsonify(latest)
+
+@cam_bp.route('/api/targets', methods=['GET'])
+def targets():
+    """People currently tracked, with their persistent IDs"""
+    state = get_targets()
+    if state is None:
+        return jsonify({'error': 'Tracking not started'}), 400
+    return jsonify(state)
+
+@cam_bp.route('/api/targets/lock', methods=['POST'])
+def lock_target_route():
+    """Follow only the given track ID"""
+    data = request.get_json(silent=True) or {}
+    if 'track_id' not in data:
+        return jsonify({'error': 'track_id is required', 'success': False}), 400
+    track_id = data['track_id']
+    if isinstance(track_id, str) and track_id.strip().isdigit():
+        track_id = int(track_id)
+    if isinstance(track_id, bool) or not isinstance(track_id, int):
+        return jsonify({'error': 'track_id must be an integer', 'success': False}), 400
+    if not lock_target(track_id):
+        return jsonify({'error': f"No track with id {track_id}", 'success': False}), 404
+    return jsonify({'message': f"Locked on track {track_id}", 'success': True})
+
+@cam_bp.route('/api/targets/unlock', methods=['POST'])
+def unlock_target_route():
+    """Go back to following the automatically selected person"""
+    if not unlock_target():
+        return jsonify({'error': 'Tracking not started', 'success': False}), 400
+    return jsonify({'message': 'Target unlocked', 'success': True})
\ No newline at end of file
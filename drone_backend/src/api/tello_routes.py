@@ -1,4 +1,4 @@
-from src.utils import run_logic, stop_logic
+from src.utils import run_logic, stop_logic, get_readiness
 from flask import Blueprint, jsonify, request, Response
 
 tello_bp = Blueprint('tello', __name__)
@@ -22,4 +22,10 @@ def land():
         stop_logic()
         initialize_takeoff = False
         return jsonify({'message': 'Drone landing initiated'})
-    return jsonify({'message': 'Drone is already landed'})
\ No newline at end of file
+    return jsonify({'message': 'Drone is already landed'})
+
+@tello_bp.route('/api/ready', methods=['GET'])
+def ready():
+    """Per-component startup status; 503 until everything is ready"""
+    state = get_readiness()
+    return jsonify(state), 200 if state['ready'] else 503
\ No newline at end of file
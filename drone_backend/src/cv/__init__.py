@@ -1,3 +1,3 @@
 from src.cv.head_detection import HeadDetector
-from src.cv.object_detection import run_model
+from src.cv.object_detection import run_model, ObjectDetector
 from src.cv.aruco import ArucoDetector
\ No newline at end of file
@@ -1,33 +1,169 @@
 """
 Won't use for now but if initial calibration is bad
-then will have to add extra steps to align drone in the air 
+then will have to add extra steps to align drone in the air
 however I don't think this will be necessary
+
+detect_all finds every marker in one pass and returns a 6-DoF pose per
+marker id via solvePnP. Frames are undistorted with remap tables built once
+per resolution, and after a hit only the area around the last seen markers
+is searched, with a full-frame search every few frames to pick up new ones.
 """
 
 import cv2
 import numpy as np
 
+# Tello camera diagonal field of view, used to approximate intrinsics when none are given
+TELLO_DIAGONAL_FOV_DEG = 82.6
+
+
+def approximate_camera_matrix(width, height, diagonal_fov_deg=TELLO_DIAGONAL_FOV_DEG):
+    """Pinhole intrinsics from the field of view; calibrate the camera for accurate poses"""
+    focal = np.hypot(width, height) / 2 / np.tan(np.radians(diagonal_fov_deg) / 2)
+    return np.array([[focal, 0, width / 2], [0, focal, height / 2], [0, 0, 1]], dtype=np.float64)
+
+
 class ArucoDetector:
-    def __init__(self, marker_size=6):
+    def __init__(self, marker_size=6, camera_matrix=None, dist_coeffs=None, calibration_size=None,
+                 roi_margin=0.5, full_search_interval=15):
+        """
+        Args:
+            marker_size: Printed marker side length; poses come out in the same unit
+            camera_matrix: 3x3 intrinsics; approximated from the Tello FOV if None
+            dist_coeffs: Distortion coefficients; frames are only remapped when given
+            calibration_size: (width, height) the intrinsics were calibrated at, so
+                they can be rescaled to the stream resolution
+            roi_margin: Tracked search area padding, as a fraction of the marker span
+            full_search_interval: Search the whole frame at least every N frames
+        """
         self.aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
         self.aruco_params = cv2.aruco.DetectorParameters()
         self.detector = cv2.aruco.ArucoDetector(self.aruco_dict, self.aruco_params)
-    
+
+        self.marker_size = marker_size
+        half = marker_size / 2
+        # Same order as detectMarkers corners: top-left, top-right, bottom-right, bottom-left
+        self.object_points = np.array([[-half, half, 0], [half, half, 0],
+                                       [half, -half, 0], [-half, -half, 0]], dtype=np.float32)
+
+        self.camera_matrix = None if camera_matrix is None else np.asarray(camera_matrix, dtype=np.float64)
+        self.dist_coeffs = None if dist_coeffs is None else np.asarray(dist_coeffs, dtype=np.float64)
+        self.calibration_size = calibration_size
+        self.roi_margin = roi_margin
+        self.full_search_interval = full_search_interval
+
+        self._shape = None
+        self._intrinsics = None
+        self._maps = None
+        self._gray = None
+        self._undistorted = None
+        self._roi = None
+        self._frames_since_full = 0
+        self.stats = {'frames': 0, 'roi_searches': 0, 'full_searches': 0}
+
+    def _prepare(self, h, w):
+        """Intrinsics, remap tables and buffers for an h x w stream, rebuilt only on resize"""
+        self._shape = (h, w)
+        if self.camera_matrix is None:
+            intrinsics = approximate_camera_matrix(w, h)
+        else:
+            intrinsics = self.camera_matrix.copy()
+            if self.calibration_size is not None:
+                intrinsics[0] *= w / self.calibration_size[0]
+                intrinsics[1] *= h / self.calibration_size[1]
+        self._intrinsics = intrinsics
+
+        self._maps = None
+        if self.dist_coeffs is not None and np.any(self.dist_coeffs):
+            # Remapped frames follow the same intrinsics with zero distortion
+            self._maps = cv2.initUndistortRectifyMap(intrinsics, self.dist_coeffs, None, intrinsics,
+                                                     (w, h), cv2.CV_16SC2)
+            self._undistorted = np.empty((h, w), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._roi = None
+
+    def _search_bounds(self, h, w):
+        """Crop (x0, y0, x1, y1) around the last seen markers, or None for a full search"""
+        if self._roi is None or self._frames_since_full >= self.full_search_interval:
+            return None
+        x0, y0, x1, y1 = self._roi
+        pad_x = (x1 - x0) * self.roi_margin
+        pad_y = (y1 - y0) * self.roi_margin
+        return (int(max(x0 - pad_x, 0)), int(max(y0 - pad_y, 0)),
+                int(min(x1 + pad_x, w)), int(min(y1 + pad_y, h)))
+
+    def _find_markers(self, image):
+        h, w = image.shape
+        bounds = self._search_bounds(h, w)
+        if bounds is not None:
+            x0, y0, x1, y1 = bounds
+            self.stats['roi_searches'] += 1
+            self._frames_since_full += 1
+            corners, ids, _ = self.detector.detectMarkers(image[y0:y1, x0:x1])
+            if ids is not None:
+                return [c + np.float32((x0, y0)) for c in corners], ids
+            # Lost them inside the crop; fall through to a full search
+
+        self.stats['full_searches'] += 1
+        self._frames_since_full = 0
+        corners, ids, _ = self.detector.detectMarkers(image)
+        return corners, ids
+
+    def detect_all(self, frame):
+        """
+        Every visible marker in one pass
+
+        Returns {marker_id: pose} where pose has 'rvec' and 'tvec' (marker in
+        camera coordinates, marker_size units), 'distance', the normalized
+        'center', 'size' as a fraction of the frame area, and pixel 'corners'.
+        """
+        h, w = frame.shape[:2]
+        if self._shape != (h, w):
+            self._prepare(h, w)
+        self.stats['frames'] += 1
+
+        if frame.ndim == 3:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        else:
+            np.copyto(self._gray, frame)
+        image = self._gray
+        if self._maps is not None:
+            cv2.remap(self._gray, self._maps[0], self._maps[1], cv2.INTER_LINEAR, dst=self._undistorted)
+            image = self._undistorted
+
+        corners, ids = self._find_markers(image)
+        if ids is None:
+            self._roi = None
+            return {}
+
+        no_distortion = np.zeros(5)
+        poses = {}
+        for marker_id, marker_corners in zip(ids.ravel().tolist(), corners):
+            points = marker_corners.reshape(4, 2)
+            ok, rvec, tvec = cv2.solvePnP(self.object_points, points, self._intrinsics, no_distortion,
+                                          flags=cv2.SOLVEPNP_IPPE_SQUARE)
+            if not ok:
+                continue
+            center = points.mean(axis=0)
+            poses[marker_id] = {
+                'rvec': rvec.ravel(),
+                'tvec': tvec.ravel(),
+                'distance': float(np.linalg.norm(tvec)),
+                'center': (float(center[0] / w), float(center[1] / h)),
+                'size': float(cv2.contourArea(points) / (h * w)),
+                'corners': points,
+            }
+
+        all_points = np.concatenate([c.reshape(4, 2) for c in corners])
+        self._roi = (*all_points.min(axis=0), *all_points.max(axis=0))
+        return poses
+
     def detect(self, frame, target_marker_id):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        corners, ids, _ = self.detector.detectMarkers(gray)
-
-        if ids is not None and target_marker_id in ids:
-            idx = np.where(ids == target_marker_id)[0][0]
-            corner = corners[idx][0]
-            
-            center_x = np.mean(corner[:, 0]) / frame.shape[1]
-            center_y = np.mean(corner[:, 1]) / frame.shape[0]
-            
-            area = cv2.contourArea(corner)
-            frame_area = frame.shape[0] * frame.shape[1]
-            size = area / frame_area
-            
-            return (center_x, center_y, size)
-        
-        return None
\ No newline at end of file
+        """Normalized (center_x, center_y, size) of one marker, or None"""
+        pose = self.detect_all(frame).get(target_marker_id)
+        if pose is None:
+            return None
+        center_x, center_y = pose['center']
+        return (center_x, center_y, pose['size'])
+
+    def get_stats(self):
+        return dict(self.stats)
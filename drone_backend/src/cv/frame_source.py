@@ -0,0 +1,445 @@
+"""
+Frame sources for the tracking loop.
+
+Every source yields Frame tuples carrying the BGR image, a capture timestamp
+(time.time() base, so it mixes with the tracker and scheduler clocks) and a
+per-source sequence number that only advances on a new image. Live sources
+that hand back the same array until the decoder produces the next one (the
+Tello) are waited on instead of being re-delivered, and the repeats are
+counted. A live source that goes quiet for longer than stall_timeout is
+flagged as stalled in its stats and waited on, not ended: read() returns None
+only when the source is exhausted, released, or its stop_flag is set. Live
+sources stamp frames when they are read; recorded and
+synthetic sources stamp them at their nominal frame interval from the
+moment they were opened, so replays are deterministic whatever speed the
+loop runs at.
+
+Sources are picked by a config string (see create_frame_source), which lets
+the whole backend run without a camera or a drone:
+
+    tello                    drone camera (needs a connected TelloController)
+    webcam[:index]           cv2.VideoCapture device, newest frame only
+    file:<path>              recorded video
+    images:<dir or glob>     image sequence, sorted by name
+    synthetic                generated frames with a moving head-like target
+
+Options go after a '?', e.g. 'file:clip.mp4?realtime=1&loop=1',
+'synthetic?fps=15&frames=300' or 'webcam:0?width=1280&height=720&fourcc=MJPG&buffer=1'
+(threaded=0 reads the device directly).
+"""
+
+import glob
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+Frame = namedtuple('Frame', ['image', 'timestamp', 'seq'])
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FrameSource:
+    """Base class: open() once, read() until it returns None, then release()"""
+
+    name = 'source'
+    poll_interval = 0.002  # seconds between checks while waiting for a new image
+    stall_timeout = 5.0  # report a stall when no new image arrives for this long
+
+    def __init__(self):
+        self.seq = 0
+        self._last_image = None
+        self._released = threading.Event()
+        self.stop_flag = None  # optional threading.Event that ends a wait for a new image
+        self.on_stall = None  # called once when a wait passes stall_timeout
+        self.stalled = False
+        self.stats = {'duplicates_skipped': 0, 'wait_ms': 0.0, 'stalls': 0}
+
+    def open(self):
+        """Prepare the source; returns False if it cannot deliver frames"""
+        return True
+
+    def read(self):
+        """Next new Frame, blocking until one arrives; None when the source is exhausted or failed"""
+        image = self._next_image()
+        if image is None:
+            return None
+        return self._emit(image, time.time())
+
+    def _next_image(self):
+        """Next image that is not the one returned last time; None if exhausted or interrupted"""
+        started = None
+        while True:
+            image = self._read_image()
+            if image is None or image is not self._last_image:
+                if started is not None:
+                    self.stats['wait_ms'] += (time.time() - started) * 1000
+                    self._end_wait(started)
+                self._last_image = image
+                return image
+            self.stats['duplicates_skipped'] += 1
+            now = time.time()
+            if started is None:
+                started = now
+            else:
+                self._check_stall(started, now)
+            if self._interrupted():
+                return None
+            time.sleep(self.poll_interval)
+
+    def _interrupted(self):
+        return self._released.is_set() or (self.stop_flag is not None and self.stop_flag.is_set())
+
+    def _check_stall(self, started, now):
+        """Flag the source as stalled once a wait that began at started passes stall_timeout"""
+        if self.stalled or now - started <= self.stall_timeout:
+            return
+        self.stalled = True
+        self.stats['stalls'] += 1
+        print(f"Warning: No new frame from '{self.name}' for {self.stall_timeout:.0f}s, still waiting")
+        if self.on_stall is not None:
+            self.on_stall()
+
+    def _end_wait(self, started):
+        if self.stalled:
+            self.stalled = False
+            print(f"Frames from '{self.name}' resumed after {time.time() - started:.1f}s")
+
+    def _read_image(self):
+        raise NotImplementedError
+
+    def _emit(self, image, timestamp):
+        self.seq += 1
+        return Frame(image, timestamp, self.seq)
+
+    def release(self):
+        """Close the source; a read() waiting for a new image returns None"""
+        self._released.set()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['wait_ms'] = round(stats['wait_ms'], 1)
+        stats['source'] = self.name
+        stats['frames'] = self.seq
+        stats['stalled'] = self.stalled
+        return stats
+
+    def __enter__(self):
+        if not self.open():
+            raise RuntimeError(f"Could not open frame source '{self.name}'")
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class TelloFrameSource(FrameSource):
+    """Frames from the drone camera; open() waits for the first decoded frame"""
+
+    name = 'tello'
+
+    def __init__(self, drone, first_frame_timeout=10):
+        super().__init__()
+        self.drone = drone
+        self.first_frame_timeout = first_frame_timeout
+
+    def open(self):
+        print("Using Tello camera...")
+        print("Waiting for drone video stream...")
+        start_time = time.time()
+        while time.time() - start_time < self.first_frame_timeout:
+            if self.drone.get_frame() is not None:
+                print("Drone video stream ready!")
+                return True
+            time.sleep(0.1)
+        print("Error: Could not get video stream from drone")
+        return False
+
+    def _read_image(self):
+        return self.drone.get_frame()
+
+
+class WebcamFrameSource(FrameSource):
+    """
+    Local camera through cv2.VideoCapture
+
+    By default a grabber thread drains the device continuously and keeps only
+    the newest frame, so a slow consumer always gets the latest image instead
+    of working through OpenCV's internal backlog. Frames are stamped when grabbed.
+    """
+
+    name = 'webcam'
+
+    def __init__(self, index=0, width=640, height=480, fourcc='MJPG', buffer_size=1, threaded=True):
+        """
+        Args:
+            index: cv2.VideoCapture device index
+            width, height: Requested capture resolution
+            fourcc: Pixel format to request (MJPG lets USB cameras reach full frame rate); None keeps the default
+            buffer_size: Driver-side frame buffer length (CAP_PROP_BUFFERSIZE)
+            threaded: Grab on a background thread and serve only the newest frame
+        """
+        super().__init__()
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.threaded = threaded
+        self.cap = None
+        self.thread = None
+        self._cond = threading.Condition()
+        self._latest = None
+        self._stopped = False
+        self.stats['grabbed'] = 0
+        self.stats['stale_dropped'] = 0
+
+    def open(self):
+        print("Opening webcam...")
+        self.cap = cv2.VideoCapture(self.index)
+        if not self.cap.isOpened():
+            print('Error: Could not open camera.')
+            return False
+        # FOURCC first: some drivers only offer higher resolutions/rates in MJPG
+        if self.fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        # Set camera resolution for better performance
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.buffer_size:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        if self.threaded:
+            self._stopped = False
+            self.thread = threading.Thread(target=self._grab_loop, name='webcam-grabber', daemon=True)
+            self.thread.start()
+        return True
+
+    def _grab_loop(self):
+        while not self._stopped:
+            ret, frame = self.cap.read()
+            grabbed_at = time.time()
+            with self._cond:
+                if not ret:
+                    self._stopped = True
+                    self._cond.notify_all()
+                    break
+                self.stats['grabbed'] += 1
+                if self._latest is not None:
+                    self.stats['stale_dropped'] += 1
+                self._latest = (frame, grabbed_at)
+                self._cond.notify_all()
+
+    def read(self):
+        if not self.threaded:
+            return super().read()
+        started = time.time()
+        with self._cond:
+            # Wake up now and then to notice a stall or a stop_flag
+            while self._latest is None and not self._stopped and not self._interrupted():
+                self._cond.wait(timeout=0.1)
+                self._check_stall(started, time.time())
+            if self._latest is None:
+                return None
+            frame, grabbed_at = self._latest
+            self._latest = None
+        self._end_wait(started)
+        return self._emit(frame, grabbed_at)
+
+    def _read_image(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def release(self):
+        super().release()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+            self.thread = None
+        if self.cap is not None:
+            self.cap.release()
+
+
+class _TimedFrameSource(FrameSource):
+    """Source with a nominal frame rate: optional real-time pacing and looping"""
+
+    def __init__(self, fps=30.0, realtime=False, loop=False, max_frames=None):
+        super().__init__()
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self.max_frames = max_frames
+        self._start = None
+
+    def read(self):
+        if self.max_frames is not None and self.seq >= self.max_frames:
+            return None
+        image = self._read_image()
+        if image is None and self.loop and self.seq > 0:
+            self._rewind()
+            image = self._read_image()
+        if image is None:
+            return None
+
+        if self._start is None:
+            self._start = time.time()
+        timestamp = self._start + self.seq / self.fps
+        if self.realtime:
+            delay = timestamp - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        return self._emit(image, timestamp)
+
+    def _rewind(self):
+        raise NotImplementedError
+
+
+class VideoFileFrameSource(_TimedFrameSource):
+    """Recorded video file"""
+
+    name = 'file'
+
+    def __init__(self, path, realtime=False, loop=False, max_frames=None):
+        super().__init__(realtime=realtime, loop=loop, max_frames=max_frames)
+        self.path = path
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            print(f'Error: Could not open video {self.path}')
+            return False
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or self.fps
+        return True
+
+    def _read_image(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        super().release()
+        if self.cap is not None:
+            self.cap.release()
+
+
+class ImageSequenceFrameSource(_TimedFrameSource):
+    """Directory (or glob pattern) of still images, read in name order"""
+
+    name = 'images'
+
+    def __init__(self, pattern, fps=30.0, realtime=False, loop=False, max_frames=None):
+        super().__init__(fps=fps, realtime=realtime, loop=loop, max_frames=max_frames)
+        self.pattern = pattern
+        self.paths = []
+        self._index = 0
+
+    def open(self):
+        if os.path.isdir(self.pattern):
+            paths = [os.path.join(self.pattern, name) for name in os.listdir(self.pattern)]
+        else:
+            paths = glob.glob(self.pattern)
+        self.paths = sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            print(f'Error: No images found at {self.pattern}')
+            return False
+        return True
+
+    def _read_image(self):
+        while self._index < len(self.paths):
+            image = cv2.imread(self.paths[self._index])
+            self._index += 1
+            if image is not None:
+                return image
+        return None
+
+    def _rewind(self):
+        self._index = 0
+
+
+class SyntheticFrameSource(_TimedFrameSource):
+    """
+    Generated frames: a skin-toned head with eyes drifting over a gradient
+
+    Enough structure for the pipeline, overlay and stream code to run on a
+    machine with no camera; whether the pose model detects it depends on the model.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, width=640, height=480, fps=30.0, realtime=True, max_frames=None):
+        super().__init__(fps=fps, realtime=realtime, max_frames=max_frames)
+        self.width = width
+        self.height = height
+        gradient = np.linspace(40, 120, width, dtype=np.uint8)
+        self._background = np.repeat(np.tile(gradient, (height, 1))[:, :, None], 3, axis=2)
+        self._frame = np.empty_like(self._background)
+
+    def _read_image(self):
+        t = self.seq / self.fps
+        cx = int(self.width / 2 + self.width / 4 * math.sin(t * 0.7))
+        cy = int(self.height / 2 + self.height / 6 * math.sin(t * 1.1))
+        radius = int(self.height / 10 * (1.0 + 0.3 * math.sin(t * 0.3)))
+
+        # A fresh array per frame, like a real camera, so consumers can keep references
+        frame = self._background.copy()
+        cv2.circle(frame, (cx, cy + radius * 3), radius * 2, (90, 60, 160), -1)
+        cv2.circle(frame, (cx, cy), radius, (150, 180, 220), -1)
+        for dx in (-radius // 3, radius // 3):
+            cv2.circle(frame, (cx + dx, cy - radius // 5), max(radius // 8, 2), (30, 30, 30), -1)
+        return frame
+
+
+def _parse_options(spec):
+    spec, _, query = spec.partition('?')
+    options = {}
+    for item in filter(None, query.split('&')):
+        key, _, value = item.partition('=')
+        options[key] = value
+    return spec, options
+
+
+def create_frame_source(spec=None, drone=None):
+    """
+    Build a FrameSource from a config string (see module docstring)
+
+    With no spec the drone camera is used when a drone is given, else the webcam.
+    """
+    if not spec:
+        spec = 'tello' if drone is not None else 'webcam'
+    spec, options = _parse_options(spec)
+    kind, _, target = spec.partition(':')
+
+    realtime = options.get('realtime', '0') == '1'
+    loop = options.get('loop', '0') == '1'
+    max_frames = int(options['frames']) if 'frames' in options else None
+
+    if kind == 'tello':
+        if drone is None:
+            raise ValueError("Frame source 'tello' needs a drone")
+        return TelloFrameSource(drone)
+    if kind == 'webcam':
+        return WebcamFrameSource(int(target or 0),
+                                 width=int(options.get('width', 640)),
+                                 height=int(options.get('height', 480)),
+                                 fourcc=options.get('fourcc', 'MJPG') or None,
+                                 buffer_size=int(options.get('buffer', 1)),
+                                 threaded=options.get('threaded', '1') == '1')
+    if kind == 'file':
+        return VideoFileFrameSource(target, realtime=realtime, loop=loop, max_frames=max_frames)
+    if kind == 'images':
+        return ImageSequenceFrameSource(target, fps=float(options.get('fps', 30)),
+                                        realtime=realtime, loop=loop, max_frames=max_frames)
+    if kind == 'synthetic':
+        return SyntheticFrameSource(fps=float(options.get('fps', 30)),
+                                    realtime=options.get('realtime', '1') == '1',
+                                    max_frames=max_frames)
+    raise ValueError(f"Unknown frame source '{spec}'")
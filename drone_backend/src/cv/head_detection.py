@@ -1,23 +1,151 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import os
 import time
 from collections import deque
+from src.cv.pipeline import DetectionPipeline
+from src.cv.inference_backends import load_pose_model
+from src.cv.quantization import build_int8_model
+from src.cv.scheduling import AdaptiveFrameScheduler
+from src.cv.person_tracker import PersonTracker
+from src.cv.overlay import OverlayCompositor, detection_metadata
+from src.cv.keypoints import head_estimates
+from src.cv.motion_gate import MotionGate
+from src.cv.preprocess import LetterboxPreprocessor
+from src.cv.frame_source import create_frame_source
+from src.cv.optical_flow import KeypointFlowTracker
+
+class HeadKalmanTracker:
+    """Constant-velocity Kalman filter over (x, y, head_size) in square-frame pixels"""
+
+    def __init__(self, accel_noise=800.0, position_noise=16.0, size_noise=36.0):
+        """
+        accel_noise: Variance of the unmodelled acceleration (px/s^2)^2
+        position_noise: Measurement variance of the nose position (px^2)
+        size_noise: Measurement variance of the head size (px^2)
+        """
+        self.accel_noise = accel_noise
+        self.H = np.hstack([np.eye(3), np.zeros((3, 3))])
+        self.R = np.diag([position_noise, position_noise, size_noise])
+        self.reset()
+
+    def reset(self):
+        self.state = np.zeros(6)  # x, y, size, vx, vy, vsize
+        self.P = np.diag([100.0, 100.0, 100.0, 1000.0, 1000.0, 1000.0])
+        self.last_time = None
+        self.initialized = False
+        self.missed = 0
+
+    def predict(self, timestamp):
+        """Advance the state to timestamp; returns predicted (x, y, size) or None"""
+        if not self.initialized:
+            return None
+        dt = min(max(timestamp - self.last_time, 0.0), 1.0)
+        self.last_time = timestamp
+        if dt > 0:
+            F = np.eye(6)
+            F[:3, 3:] = np.eye(3) * dt
+            G = np.vstack([np.eye(3) * (0.5 * dt * dt), np.eye(3) * dt])
+            self.state = F @ self.state
+            self.P = F @ self.P @ F.T + G @ G.T * self.accel_noise
+        return self.state[:3].copy()
+
+    def update(self, x, y, size, timestamp):
+        """Fold in a measurement; returns filtered (x, y, size)"""
+        measurement = np.array([x, y, size], dtype=float)
+        self.missed = 0
+        if not self.initialized:
+            self.state[:3] = measurement
+            self.state[3:] = 0.0
+            self.last_time = timestamp
+            self.initialized = True
+            return self.state[:3].copy()
+
+        innovation = measurement - self.H @ self.state
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.state = self.state + K @ innovation
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+        return self.state[:3].copy()
+
+    @property
+    def velocity(self):
+        """Estimated (vx, vy, vsize) in px/s"""
+        return self.state[3:].copy()
+
 
 class HeadDetector:
-    def __init__(self, model_path=None, drone=None):
+    def __init__(self, model_path=None, drone=None, pipeline_mode=False, backend='pytorch',
+                 imgsz=640, model_cache_dir=None, int8=False, calibration_source=None,
+                 int8_tolerance_px=3.0, roi_mode=False, roi_imgsz=320, adaptive_skip=False,
+                 inference_client=None, client_side_annotations=False, motion_gate=False,
+                 tensor_input=False, square_input=False, frame_source=None, optical_flow=False):
         """
         Initialize YOLO-based head detector using pose estimation
         model_path: Path to YOLO pose model (e.g., 'yolov8n-pose.pt')
                    If None, will download YOLOv8n-pose automatically
+        pipeline_mode: Run capture, inference, control and rendering as separate
+                   threaded stages (see src.cv.pipeline) instead of one loop
+        backend: Inference backend - 'pytorch', 'onnx' or 'openvino'
+        imgsz: Inference size for the full-frame pass
+        model_cache_dir: Where exported ONNX/OpenVINO models are cached
+        int8: Load an INT8 quantized ONNX model, falling back to `backend` if it
+                   fails the accuracy check against FP32
+        calibration_source: Recorded video or image directory for INT8 calibration
+        int8_tolerance_px: Max mean nose/eye keypoint error allowed for the INT8 model
+        roi_mode: Run the model on a crop around the tracked head instead of the full frame
+        roi_imgsz: Inference size for ROI crops
+        adaptive_skip: Decide per frame whether to run inference from measured latency
+                   and head speed (see src.cv.scheduling) instead of skip_frames
+        inference_client: Client from a shared BatchInferenceService
+                   (src.cv.inference_service); when given no model is loaded here
+        client_side_annotations: Only composite the static overlay; head box and
+                   status are left to clients reading the detection metadata
+        motion_gate: Skip scheduled inference while the area around the head is
+                   static (see src.cv.motion_gate), reusing the tracker estimate
+        tensor_input: Letterbox into preallocated buffers and feed the model a tensor
+                   (see src.cv.preprocess) instead of letting Ultralytics preprocess
+        square_input: Run the full-frame pass on the centered square crop
+        frame_source: Frame source spec for run_head_detection (see
+                   src.cv.frame_source); defaults to the drone camera, else the webcam
+        optical_flow: Move the face keypoints with Lucas-Kanade flow on frames without
+                   inference (see src.cv.optical_flow) instead of only predicting them
         """
         if model_path is None:
             model_path = os.path.expanduser('~/.ultralytics/weights/yolov8n-pose.pt')
         self.drone = drone
+        self.frame_source_spec = frame_source
+        # Called with every captured Frame, e.g. to share the camera with ObjectDetector
+        self.frame_listeners = []
+        self.source = None
+        self.last_error = None  # why the last run_head_detection stopped early, if it did
+        self.frame_ages = deque(maxlen=120)  # capture-to-inference age of recent frames (s)
         self.model_path = model_path
+        self.pipeline_mode = pipeline_mode
+        self.pipeline = None
+        self.overlay = OverlayCompositor(client_side_annotations)
+        self.backend = backend
+        self.imgsz = imgsz
+        self.model_cache_dir = model_cache_dir
+        self.int8 = int8
+        self.calibration_source = calibration_source
+        self.int8_tolerance_px = int8_tolerance_px
+        self.quantization_report = None
+        self.inference_client = inference_client
+        self.square_input = square_input
         self.frame_count = 0
-        self._initialize_yolo()
+        if inference_client is not None:
+            self.model = inference_client
+        else:
+            self._initialize_yolo()
+
+        # The batch service stacks raw frames, so shared-model clients keep numpy input
+        self.tensor_input = tensor_input and inference_client is None
+        if tensor_input and inference_client is not None:
+            print("tensor_input is not supported with a shared inference service, ignoring")
+        self.preprocessor = LetterboxPreprocessor(imgsz) if self.tensor_input else None
+        self.quick_preprocessor = LetterboxPreprocessor(320) if self.tensor_input else None
+        self._quick_frame = np.empty((240, 320, 3), dtype=np.uint8)
         
         # Direction flags
         self.left = False
@@ -33,9 +161,31 @@ class HeadDetector:
         self.yaw_velocity = 0
         self.position_buffer = deque(maxlen=5)
         self.size_buffer = deque(maxlen=5)
+        self.tracker = HeadKalmanTracker()
+        self.person_tracker = PersonTracker()
+        self.max_missed_inferences = 3
         self.skip_frames = 2
         self.current_frame_skip = 0
+        self.scheduler = AdaptiveFrameScheduler() if adaptive_skip else None
+        self.motion_gate = MotionGate() if motion_gate else None
+        self.flow = KeypointFlowTracker() if optical_flow else None
         self.last_detection = None
+
+        # Region-of-interest inference around the tracked head
+        self.roi_mode = roi_mode
+        self.roi_imgsz = roi_imgsz
+        self.roi_scale = 4.0  # crop side as a multiple of head size
+        self.roi_min_size = 160
+        self.full_search_interval = 30  # force a full-frame pass every N inferences
+        self.inferences_since_full = 0
+        self.roi_preprocessor = LetterboxPreprocessor(roi_imgsz) if self.tensor_input and roi_mode else None
+        self.roi_stats = {
+            'roi_inferences': 0,
+            'roi_misses': 0,
+            'full_inferences': 0,
+            'pixels_processed': 0,
+            'full_frame_pixels': 0,
+        }
     
         self.velocity_alpha = 0.3 
         
@@ -45,28 +195,37 @@ class HeadDetector:
 
     def _initialize_yolo(self):
         """Initialize YOLO pose model for head detection"""
-        print(f"Loading YOLO pose model: {self.model_path}")
-        self.model = YOLO(self.model_path)
-        self.model.fuse()
+        if self.int8 and self._initialize_int8():
+            return
+        print(f"Loading YOLO pose model: {self.model_path} ({self.backend})")
+        self.model = load_pose_model(self.model_path, backend=self.backend, imgsz=self.imgsz,
+                                     cache_dir=self.model_cache_dir)
         print("YOLO pose model loaded successfully")
 
-    def _smooth_position(self, x, y, size):
-        """Apply temporal smoothing to reduce jitter"""
-        self.position_buffer.append((x, y))
-        self.size_buffer.append(size)
-        
-        if len(self.position_buffer) < 3:
-            return x, y, size
-        
-        weights = np.array([0.2, 0.3, 0.5])
-        positions = np.array(list(self.position_buffer)[-3:])
-        sizes = np.array(list(self.size_buffer)[-3:])
-        
-        smooth_x = int(np.average(positions[:, 0], weights=weights))
-        smooth_y = int(np.average(positions[:, 1], weights=weights))
-        smooth_size = int(np.average(sizes, weights=weights))
-        
-        return smooth_x, smooth_y, smooth_size
+    def _initialize_int8(self):
+        """Load the INT8 pose model if it passes the accuracy guardrail"""
+        try:
+            int8_path, self.quantization_report = build_int8_model(
+                self.model_path,
+                imgsz=self.imgsz,
+                calibration_source=self.calibration_source,
+                tolerance_px=self.int8_tolerance_px,
+                cache_dir=self.model_cache_dir,
+            )
+        except Exception as e:
+            print(f"INT8 quantization failed: {e}")
+            return False
+
+        if int8_path is None:
+            print(f"INT8 model rejected, falling back to {self.backend}")
+            return False
+
+        from ultralytics import YOLO
+
+        print(f"Loading INT8 pose model: {int8_path}")
+        self.model = YOLO(int8_path, task='pose')
+        print("YOLO pose model loaded successfully")
+        return True
 
     def _smooth_velocity(self, target_velocity, current_velocity):
         """Smooth velocity changes to prevent jerky movements"""
@@ -151,8 +310,11 @@ class HeadDetector:
     def FoundHead(self, frame):
         """Quick check if a head is detected - optimized version"""
         try:
-            small_frame = cv2.resize(frame, (320, 240))
-            results = self.model(small_frame, verbose=False, conf=0.3, imgsz=320)
+            if self.quick_preprocessor is not None:
+                results = self.model(self.quick_preprocessor(frame), verbose=False, conf=0.3)
+            else:
+                cv2.resize(frame, (320, 240), dst=self._quick_frame)
+                results = self.model(self._quick_frame, verbose=False, conf=0.3, imgsz=320)
             
             if results[0].keypoints is not None and len(results[0].keypoints) > 0:
                 return True
@@ -161,47 +323,428 @@ class HeadDetector:
             print(f'Error in FoundHead: {e}')
             return False
 
-    def run_head_detection(self, frame_callback=None, stop_flag=None, send_commands=False):
-        """Main detection loop - optimized version"""
-        print("Initializing YOLO pose detection...")
-        drone = self.drone
+    def _open_frame_source(self):
+        """Open the configured frame source; returns it, or None if it cannot deliver frames"""
+        try:
+            source = create_frame_source(self.frame_source_spec, self.drone)
+        except ValueError as e:
+            print(f'Error: {e}')
+            return None
+        if not source.open():
+            return None
+        return source
 
-        cap = None
+    def _square_geometry(self, frame):
+        """Centered square crop of the frame used for control and streaming"""
+        h, w, _ = frame.shape
+        x_center = w // 2
+        y_center = h // 2
+        radius = h // 2
+        x_offset = x_center - radius
+        return {
+            'x_center': x_center,
+            'y_center': y_center,
+            'radius': radius,
+            'x_offset': x_offset,
+            'square_w': min(x_center + radius, w) - max(x_offset, 0),
+            'square_h': h,
+        }
 
-        if drone is not None:
-            print("Using Tello camera...")
-            print("Waiting for drone video stream...")
-            
-            timeout = 10
-            start_time = time.time()
-            first_frame = None
-            
-            while first_frame is None and time.time() - start_time < timeout:
-                first_frame = drone.get_frame()
-                if first_frame is None:
-                    time.sleep(0.1)
-            
-            if first_frame is None:
-                print("Error: Could not get video stream from drone")
-                return
-            
-            print("Drone video stream ready!")
-            
-            def get_frame():
-                return drone.get_frame()
+    def _update_detection(self, frame, geometry, timestamp=None):
+        """Run the pose model or predict with the tracker; returns the head detection for this frame"""
+        if timestamp is None:
+            timestamp = time.time()
         else:
-            print("Opening webcam...")
-            cap = cv2.VideoCapture(0)
-            if not cap.isOpened():
-                print('Error: Could not open camera.')
-                return
-            # Set camera resolution for better performance
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            
-            def get_frame():
-                ret, frame = cap.read()
-                return frame if ret else None
+            self.frame_ages.append(time.time() - timestamp)
+        self.tracker.predict(timestamp)
+
+        infer = self._should_infer(timestamp)
+        if not infer and self.flow is not None and self.flow.active:
+            detection = self._propagate_keypoints(frame, geometry, timestamp)
+            if detection is not None:
+                return detection
+            # Flow lost the head; measure it now instead of waiting for the next pass
+            infer = True
+            self.current_frame_skip = 0
+
+        if infer:
+            if self.motion_gate is not None:
+                if self.motion_gate.is_static(frame, self.last_detection, timestamp):
+                    return self._hold_static(geometry, timestamp)
+
+            started = time.perf_counter()
+            target = self._infer_target(frame, geometry)
+            if self.scheduler is not None:
+                self.scheduler.record_latency(time.perf_counter() - started)
+                self.scheduler.record_inference(timestamp)
+            if self.motion_gate is not None:
+                self.motion_gate.set_reference(frame, timestamp)
+
+            if target is not None:
+                detection = self._measure(target, geometry, timestamp)
+                if self.flow is not None:
+                    self.flow.start(frame, target['keypoints'], target['size'])
+                return detection
+
+            if self.flow is not None:
+                self.flow.reset()
+            self.tracker.missed += 1
+            if self.tracker.missed >= self.max_missed_inferences:
+                self.tracker.reset()
+                self.last_detection = None
+            return None
+
+        return self._predicted_detection(geometry)
+
+    def _measure(self, target, geometry, timestamp):
+        """Feed a measured head to the tracker and make it the last detection"""
+        x_head_center = int(target['center'][0])
+        y_head_center = int(target['center'][1])
+        head_size = int(target['size'])
+        keypoints = target['keypoints']
+        
+        x_head_in_square = x_head_center - geometry['x_offset']
+        y_head_in_square = y_head_center
+        self.position_buffer.append((x_head_in_square, y_head_in_square))
+        self.size_buffer.append(head_size)
+
+        smooth_x, smooth_y, smooth_size = self.tracker.update(
+            x_head_in_square, y_head_in_square, head_size, timestamp
+        )
+        
+        # Last measured detection; skipped frames are predicted from it
+        self.last_detection = {
+            'x': x_head_center,
+            'y': y_head_center,
+            'x_square': int(smooth_x),
+            'y_square': int(smooth_y),
+            'size': int(smooth_size),
+            'keypoints': keypoints
+        }
+        return self.last_detection
+
+    def _propagate_keypoints(self, frame, geometry, timestamp):
+        """Head measured from optical-flow keypoints, or None if flow lost it"""
+        keypoints = self.flow.track(frame)
+        if keypoints is None:
+            return None
+        visible = (keypoints[:, 0] > 0) & (keypoints[:, 1] > 0)
+        heads = head_estimates(np.concatenate([keypoints, visible[:, None]], axis=1)[None])
+        if not heads['valid'][0]:
+            self.flow.reset()
+            return None
+        return self._measure({
+            'keypoints': keypoints,
+            'center': heads['center'][0],
+            'size': heads['size'][0],
+        }, geometry, timestamp)
+
+    def _hold_static(self, geometry, timestamp):
+        """Nothing moved around the head: re-measure it where it was last seen"""
+        x_square, y_square = self.position_buffer[-1]
+        self.tracker.update(x_square, y_square, self.size_buffer[-1], timestamp)
+        return self._predicted_detection(geometry)
+
+    def _should_infer(self, timestamp):
+        """Whether this frame gets a pose-model pass or a tracker prediction"""
+        if self.scheduler is not None:
+            head_speed = 0.0
+            if self.tracker.initialized:
+                vx, vy, vsize = self.tracker.velocity
+                head_speed = float(np.hypot(vx, vy) + abs(vsize))
+            return self.scheduler.should_infer(timestamp, head_speed, self.last_detection is not None)
+
+        self.current_frame_skip += 1
+        if self.current_frame_skip >= self.skip_frames or self.last_detection is None:
+            self.current_frame_skip = 0
+            return True
+        return False
+
+    def _extract_people(self, results, offset=(0, 0), scale=1.0):
+        """
+        Boxes, scores, keypoints and head estimates for every detected person
+
+        Model coordinates are mapped to the full frame as model * scale + offset.
+        """
+        if not results or results[0].keypoints is None or len(results[0].keypoints) == 0:
+            return None
+        # One device-to-host copy each for all people: (n, 17, 3) keypoints and (n, 6) boxes
+        kp_data = results[0].keypoints.data.cpu().numpy()
+        box_data = results[0].boxes.data.cpu().numpy()
+        boxes = box_data[:, :4]
+        if offset != (0, 0) or scale != 1.0:
+            boxes = boxes * scale + (tuple(offset) * 2)
+            visible = (kp_data[..., 0] > 0) & (kp_data[..., 1] > 0)
+            kp_data[..., :2][visible] = kp_data[..., :2][visible] * scale + offset
+        return {
+            'boxes': boxes,
+            'scores': box_data[:, -2],
+            'keypoints': kp_data[..., :2],
+            'heads': head_estimates(kp_data),
+        }
+
+    def _select_target(self, people):
+        """Update identity tracks and return the followed person's head, or None"""
+        if people is None:
+            self.person_tracker.update([], [], [])
+            return None
+        self.person_tracker.update(people['boxes'], people['scores'], people['keypoints'])
+        track = self.person_tracker.target()
+        if track is None:
+            return None
+        heads = people['heads']
+        i = track.det_index
+        if not heads['valid'][i]:
+            return None
+        return {
+            'keypoints': people['keypoints'][i].copy(),
+            'center': heads['center'][i],
+            'size': heads['size'][i],
+            'confidence': float(heads['confidence'][i]),
+        }
+
+    def _roi_bounds(self, geometry, frame_shape):
+        """Square crop around the tracked head in full-frame coordinates, or None"""
+        if self.last_detection is None or not self.tracker.initialized:
+            return None
+        x_square, y_square, size = self.tracker.state[:3]
+        cx = x_square + geometry['x_offset']
+        cy = y_square
+        side = int(max(size * self.roi_scale, self.roi_min_size))
+        h, w = frame_shape[:2]
+        if side >= min(h, w):
+            return None
+        x0 = int(min(max(cx - side / 2, 0), w - side))
+        y0 = int(min(max(cy - side / 2, 0), h - side))
+        return x0, y0, side
+
+    def _run_model(self, image, imgsz, preprocessor, offset=(0, 0)):
+        """Pose model pass on image; people in full-frame coordinates, or None"""
+        if preprocessor is None:
+            results = self.model(image, verbose=False, conf=0.3, imgsz=imgsz)
+            return self._extract_people(results, offset)
+        results = self.model(preprocessor(image), verbose=False, conf=0.3)
+        scale, shift = preprocessor.to_source(offset)
+        return self._extract_people(results, shift, scale)
+
+    def warmup(self, iterations=2):
+        """
+        Dummy passes at every input size the detector uses
+
+        The first calls build the predictor, allocate buffers and (for exported
+        backends) compile kernels; doing that here keeps the first tracked frames fast.
+        Covers the full-frame pass, ROI crops when roi_mode is on, and the 320px
+        quick check in FoundHead. Returns first and last pass latencies, in milliseconds.
+        """
+        full = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        passes = [(str(self.imgsz), lambda: self._run_model(full, self.imgsz, self.preprocessor))]
+        if self.roi_mode:
+            crop = np.zeros((self.roi_imgsz, self.roi_imgsz, 3), dtype=np.uint8)
+            passes.append((str(self.roi_imgsz), lambda: self._run_model(crop, self.roi_imgsz, self.roi_preprocessor)))
+        camera = np.zeros((480, 640, 3), dtype=np.uint8)
+        passes.append(('quick_320', lambda: self.FoundHead(camera)))
+
+        timings = {}
+        for label, run in passes:
+            latencies = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                run()
+                latencies.append((time.perf_counter() - started) * 1000)
+            timings[label] = {'first_ms': round(latencies[0], 1), 'last_ms': round(latencies[-1], 1)}
+            print(f"Warm-up {label}: first {latencies[0]:.0f}ms, last {latencies[-1]:.0f}ms")
+        return {'iterations': iterations, 'timings': timings}
+
+    def _infer_target(self, frame, geometry):
+        """Head estimate and keypoints of the target person in full-frame coordinates, or None"""
+        h, w = frame.shape[:2]
+        self.roi_stats['full_frame_pixels'] += h * w
+
+        roi = None
+        if self.roi_mode and self.inferences_since_full < self.full_search_interval:
+            roi = self._roi_bounds(geometry, frame.shape)
+
+        if roi is not None:
+            x0, y0, side = roi
+            self.inferences_since_full += 1
+            self.roi_stats['roi_inferences'] += 1
+            self.roi_stats['pixels_processed'] += side * side
+            crop = frame[y0:y0 + side, x0:x0 + side]
+            people = self._run_model(crop, self.roi_imgsz, self.roi_preprocessor, (x0, y0))
+            target = self._select_target(people)
+            if target is not None:
+                return target
+            # Lost the target inside the crop; search the whole frame this time
+            self.roi_stats['roi_misses'] += 1
+
+        self.inferences_since_full = 0
+        self.roi_stats['full_inferences'] += 1
+        image, offset = frame, (0, 0)
+        if self.square_input:
+            x_offset = max(geometry['x_offset'], 0)
+            image = frame[0:geometry['square_h'], x_offset:x_offset + geometry['square_w']]
+            offset = (x_offset, 0)
+        self.roi_stats['pixels_processed'] += image.shape[0] * image.shape[1]
+        people = self._run_model(image, self.imgsz, self.preprocessor, offset)
+        return self._select_target(people)
+
+    def _predicted_detection(self, geometry):
+        """Shift the last measured detection to the tracker's current estimate"""
+        last = self.last_detection
+        if last is None or not self.tracker.initialized:
+            return last
+
+        x_square, y_square, size = self.tracker.state[:3]
+        dx = x_square - last['x_square']
+        dy = y_square - last['y_square']
+        keypoints = last['keypoints'].copy()
+        visible = (keypoints[:, 0] > 0) & (keypoints[:, 1] > 0)
+        keypoints[visible] += (dx, dy)
+
+        return {
+            'x': int(x_square + geometry['x_offset']),
+            'y': int(y_square),
+            'x_square': int(x_square),
+            'y_square': int(y_square),
+            'size': int(size),
+            'keypoints': keypoints
+        }
+
+    def _apply_control(self, detection, geometry):
+        """Update drone velocities from a detection and return the control values"""
+        control_values = {
+            'face_detected': detection is not None,
+            'detection': detection_metadata(detection, geometry),
+        }
+        if detection is not None:
+            self.drone_directions(detection['x_square'], detection['y_square'],
+                                  geometry['square_w'], geometry['square_h'], detection['size'])
+        else:
+            # Reset velocities when no detection
+            self.fb_velocity = 0
+            self.ud_velocity = 0
+            self.yaw_velocity = 0
+        return control_values
+
+    def stop_motion(self):
+        """Zero every velocity and direction flag so the flight loop stops sending the last command"""
+        self.lr_velocity = 0
+        self.fb_velocity = 0
+        self.ud_velocity = 0
+        self.yaw_velocity = 0
+        self.left = self.right = self.up = self.down = False
+        self.forward = self.backward = self.center = False
+
+    def _status_text(self):
+        status_text = []
+        if self.center:
+            status_text.append("CENTERED")
+        if self.left:
+            status_text.append(f"LEFT (yaw:{self.yaw_velocity})")
+        if self.right:
+            status_text.append(f"RIGHT (yaw:{self.yaw_velocity})")
+        if self.up:
+            status_text.append(f"UP (ud:{self.ud_velocity})")
+        if self.down:
+            status_text.append(f"DOWN (ud:{self.ud_velocity})")
+        if self.forward:
+            status_text.append(f"FWD (fb:{self.fb_velocity})")
+        if self.backward:
+            status_text.append(f"BACK (fb:{self.fb_velocity})")
+        return ' | '.join(status_text)
+
+    def _render_frame(self, frame, geometry, detection, current_fps):
+        """Composite the tracking overlays; returns the square frame to stream"""
+        x_offset = geometry['x_offset']
+        square_frame = frame[0:geometry['square_h'], x_offset : x_offset + 2 * geometry['radius']]
+        self.overlay.render(frame, square_frame, geometry, detection, self._status_text, current_fps)
+        return square_frame
+
+    def get_telemetry(self):
+        """Runtime counters for the tracking loop"""
+        pipeline = self.pipeline
+        return {
+            'pipeline_mode': self.pipeline_mode,
+            'pipeline': pipeline.get_stats() if pipeline is not None else None,
+            'frame_source': self.source.get_stats() if self.source is not None else None,
+            'frame_age': self._frame_age_telemetry(),
+            'roi': self._roi_telemetry(),
+            'scheduler': self.scheduler.get_stats() if self.scheduler is not None else None,
+            'motion_gate': self.motion_gate.get_stats() if self.motion_gate is not None else None,
+            'optical_flow': self.flow.get_stats() if self.flow is not None else None,
+            'targets': self.person_tracker.get_state(),
+            'overlay': self.overlay.get_stats(),
+            'inference_service': (self.inference_client.service.get_stats()
+                                  if self.inference_client is not None else None),
+        }
+
+    def _frame_age_telemetry(self):
+        """Capture-to-inference age in ms; only meaningful for live or real-time-paced sources"""
+        ages = np.array(self.frame_ages) * 1000
+        if len(ages) == 0:
+            return None
+        return {
+            'last_ms': round(float(ages[-1]), 1),
+            'avg_ms': round(float(ages.mean()), 1),
+            'p95_ms': round(float(np.percentile(ages, 95)), 1),
+            'max_ms': round(float(ages.max()), 1),
+        }
+
+    def _roi_telemetry(self):
+        stats = dict(self.roi_stats)
+        stats['enabled'] = self.roi_mode
+        full = stats['full_frame_pixels']
+        stats['pixel_ratio'] = round(stats['pixels_processed'] / full, 3) if full else None
+        return stats
+
+    def reset_tracking(self):
+        """Forget every tracked head and person, e.g. before replaying another clip"""
+        self.tracker.reset()
+        self.person_tracker.reset()
+        if self.flow is not None:
+            self.flow.reset()
+        self.position_buffer.clear()
+        self.size_buffer.clear()
+        self.last_detection = None
+        self.current_frame_skip = 0
+        self.inferences_since_full = 0
+
+    def run_head_detection(self, frame_callback=None, stop_flag=None, send_commands=False,
+                           control_callback=None, frame_source=None, headless=False):
+        """
+        Main detection loop - optimized version
+
+        frame_callback: Called with (square_frame, control_values) for every rendered frame
+        control_callback: Called with control_values right after velocities are updated
+        frame_source: Opened FrameSource to read from instead of the configured one
+        headless: Skip the OpenCV key polling, for servers and benchmarks without a display
+        """
+        print("Initializing YOLO pose detection...")
+        self.last_error = None
+
+        source = frame_source if frame_source is not None else self._open_frame_source()
+        if source is None:
+            return
+        self.source = source
+        # A stalled camera is waited on; hold the drone still until frames resume
+        source.stop_flag = stop_flag
+        source.on_stall = self.stop_motion
+
+        if self.pipeline_mode:
+            print("Starting detection pipeline...")
+            self.pipeline = DetectionPipeline(
+                self, source,
+                frame_callback=frame_callback,
+                control_callback=control_callback,
+                stop_flag=stop_flag,
+            )
+            try:
+                self.pipeline.run()
+            finally:
+                source.release()
+                self.stop_motion()
+                print('Camera now closed')
+            return
 
         print("Starting detection loop... Press 'q' to quit")
 
@@ -214,10 +757,13 @@ class HeadDetector:
                 if stop_flag and stop_flag.is_set():
                     break 
                     
-                frame = get_frame()
-                if frame is None:
+                packet = source.read()
+                if packet is None:
                     print('Error: Could not read frame.')
                     break
+                frame = packet.image
+                for listener in self.frame_listeners:
+                    listener(packet)
 
                 # FPS calculation
                 fps_counter += 1
@@ -226,156 +772,30 @@ class HeadDetector:
                     fps_counter = 0
                     fps_time = time.time()
 
-                h, w, _ = frame.shape
-                x_center = w // 2
-                y_center = h // 2
-                radius = h // 2
-
-                square_frame = frame[0:h, x_center - radius : x_center + radius]
-                new_h, new_w, _ = square_frame.shape
-
-                new_x_center, new_y_center = new_w // 2, new_h // 2
-                deadzone_radius = new_w // 8  # MUCH SMALLER deadzone (was // 4)
-                
-                grid_color = (100, 100, 100)  # Subtle gray
-                x_third = new_w // 3
-                y_third = new_h // 3
-                
-                cv2.line(square_frame, (x_third, 0), (x_third, new_h), grid_color, 1)
-                cv2.line(square_frame, (x_third * 2, 0), (x_third * 2, new_h), grid_color, 1)
-                
-                cv2.line(square_frame, (0, y_third), (new_w, y_third), grid_color, 1)
-                cv2.line(square_frame, (0, y_third * 2), (new_w, y_third * 2), grid_color, 1)
-                
-                cv2.circle(square_frame, (new_x_center, new_y_center), deadzone_radius, (0, 255, 255), 2)
-                
-                cv2.circle(square_frame, (new_x_center, new_y_center), 5, (0, 255, 255), -1)
-                
-                cv2.circle(square_frame, (new_x_center, new_y_center), deadzone_radius, (0, 255, 0), 1)
-                cv2.rectangle(square_frame, (0, 0), (new_w-1, new_h-1), (255, 255, 255), 2)
-                
-                control_values = {'face_detected': False}
-                head_detected = False
-                
-                self.current_frame_skip += 1
-                if self.current_frame_skip >= self.skip_frames or self.last_detection is None:
-                    self.current_frame_skip = 0
-                    
-                    results = self.model(frame, verbose=False, conf=0.3, imgsz=640)
-
-                    if results[0].keypoints is not None and len(results[0].keypoints) > 0:
-                        keypoints = results[0].keypoints.xy[0].cpu().numpy()
-                        
-                        nose = keypoints[0]
-                        left_eye = keypoints[1]
-                        right_eye = keypoints[2]
-                        
-                        if nose[0] > 0 and nose[1] > 0:
-                            head_detected = True
-                            control_values['face_detected'] = True
-                            
-                            x_head_center = int(nose[0])
-                            y_head_center = int(nose[1])
-                            
-                            # Calculate head size
-                            if left_eye[0] > 0 and right_eye[0] > 0:
-                                eye_distance = np.sqrt((right_eye[0] - left_eye[0])**2 + 
-                                                      (right_eye[1] - left_eye[1])**2)
-                                head_width_multiplier = 2.0
-                                head_size = int(eye_distance * head_width_multiplier)
-                            else:
-                                head_size = 100
-                            
-                            # Apply smoothing
-                            x_head_in_square = x_head_center - (x_center - radius)
-                            y_head_in_square = y_head_center
-                            
-                            smooth_x, smooth_y, smooth_size = self._smooth_position(
-                                x_head_in_square, y_head_in_square, head_size
-                            )
-                            
-                            # Cache detection for frame skipping
-                            self.last_detection = {
-                                'x': x_head_center,
-                                'y': y_head_center,
-                                'x_square': smooth_x,
-                                'y_square': smooth_y,
-                                'size': smooth_size,
-                                'keypoints': keypoints
-                            }
-                else:
-                    # Use cached detection for skipped frames
-                    if self.last_detection:
-                        head_detected = True
-                        control_values['face_detected'] = True
-                        x_head_center = self.last_detection['x']
-                        y_head_center = self.last_detection['y']
-                        smooth_x = self.last_detection['x_square']
-                        smooth_y = self.last_detection['y_square']
-                        smooth_size = self.last_detection['size']
-                        keypoints = self.last_detection['keypoints']
-
-                if head_detected and self.last_detection:
-                    half_size = smooth_size // 2
-                    x_min = x_head_center - half_size
-                    x_max = x_head_center + half_size
-                    y_min = y_head_center - half_size
-                    y_max = y_head_center + half_size
-                    
-                    cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (0, 255, 0), 3)
-                    cv2.circle(frame, (x_head_center, y_head_center), 5, (0, 255, 0), -1)
-                    cv2.line(frame, (x_head_center, y_head_center), (x_center, y_center), (0, 255, 0), 2)
-                    
-                    for kp in keypoints[:5]:
-                        if kp[0] > 0 and kp[1] > 0:
-                            cv2.circle(frame, (int(kp[0]), int(kp[1])), 3, (255, 0, 0), -1)
-
-                    self.drone_directions(smooth_x, smooth_y, new_w, new_h, smooth_size)
-                    
-                    status_text = []
-                    if self.center:
-                        status_text.append("CENTERED")
-                    if self.left:
-                        status_text.append(f"LEFT (yaw:{self.yaw_velocity})")
-                    if self.right:
-                        status_text.append(f"RIGHT (yaw:{self.yaw_velocity})")
-                    if self.up:
-                        status_text.append(f"UP (ud:{self.ud_velocity})")
-                    if self.down:
-                        status_text.append(f"DOWN (ud:{self.ud_velocity})")
-                    if self.forward:
-                        status_text.append(f"FWD (fb:{self.fb_velocity})")
-                    if self.backward:
-                        status_text.append(f"BACK (fb:{self.fb_velocity})")
-                    
-                    cv2.putText(frame, f"Head: {smooth_size}px | {' | '.join(status_text)}", 
-                               (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                else:
-                    # Reset velocities when no detection
-                    self.fb_velocity = 0
-                    self.ud_velocity = 0
-                    self.yaw_velocity = 0
-                    cv2.putText(frame, "No head detected", (10, 30), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                geometry = self._square_geometry(frame)
+                detection = self._update_detection(frame, geometry, packet.timestamp)
+                control_values = self._apply_control(detection, geometry)
+                if control_callback:
+                    control_callback(control_values)
 
-                # Display FPS
-                cv2.putText(frame, f"FPS: {current_fps}", (10, 60), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+                square_frame = self._render_frame(frame, geometry, detection, current_fps)
 
                 if frame_callback:
                     frame_callback(square_frame, control_values)
                 
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                if not headless and cv2.waitKey(1) & 0xFF == ord('q'):
                     break     
                     
         except Exception as e:
             print(f'An error occurred: {e}')
+            self.last_error = f'{type(e).__name__}: {e}'
             import traceback
             traceback.print_exc()
         finally:
-            if cap:
-                cap.release()
-            cv2.destroyAllWindows()
+            source.release()
+            self.stop_motion()
+            if not headless:
+                cv2.destroyAllWindows()
             print('Camera now closed')
 
 if __name__ == "__main__":
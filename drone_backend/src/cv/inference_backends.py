@@ -0,0 +1,96 @@
+"""
+Selectable inference backends for the YOLO pose model.
+
+PyTorch loads the .pt weights directly. ONNX Runtime and OpenVINO use an
+Ultralytics export of the same weights, cached on disk keyed by the weight
+file hash and imgsz so restarts reuse the compiled model instead of
+re-exporting. All backends return the same Ultralytics Results objects, so
+HeadDetector does not care which one is loaded.
+"""
+
+import hashlib
+import os
+import shutil
+
+BACKENDS = ('pytorch', 'onnx', 'openvino')
+DEFAULT_CACHE_DIR = os.path.expanduser('~/.cache/drone_backend/models')
+
+_EXPORT_FORMATS = {
+    'onnx': 'onnx',
+    'openvino': 'openvino',
+}
+
+
+def model_hash(model_path, length=16):
+    """Short sha256 of the weight file contents"""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def cached_model_path(model_path, backend, imgsz, cache_dir=None, variant=''):
+    """Location of the exported model for this weight file, backend and imgsz"""
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    name = f"{stem}-{model_hash(model_path)}-{imgsz}{variant}"
+    if backend == 'onnx':
+        return os.path.join(cache_dir, f"{name}.onnx")
+    if backend == 'openvino':
+        # Ultralytics recognizes OpenVINO models by the '_openvino_model' directory suffix
+        return os.path.join(cache_dir, f"{name}_openvino_model")
+    raise ValueError(f"Backend '{backend}' has no exported model")
+
+
+def _export(model_path, backend, imgsz, target):
+    from ultralytics import YOLO
+
+    print(f"Exporting {model_path} to {backend} (imgsz={imgsz})...")
+    model = YOLO(model_path)
+    # dynamic=True keeps smaller passes (quick checks, ROI crops) working on the same export
+    exported = model.export(format=_EXPORT_FORMATS[backend], imgsz=imgsz, dynamic=True, half=False)
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(target):
+        shutil.rmtree(target) if os.path.isdir(target) else os.remove(target)
+    shutil.move(str(exported), target)
+    print(f"Cached {backend} model at {target}")
+    return target
+
+
+def resolve_weights(model_path):
+    """Path to the .pt weights on disk, letting Ultralytics download them if missing"""
+    if os.path.exists(model_path):
+        return model_path
+    from ultralytics import YOLO
+    return YOLO(model_path).ckpt_path
+
+
+def load_pose_model(model_path, backend='pytorch', imgsz=640, cache_dir=None):
+    """
+    Load the pose model on the requested backend
+
+    Args:
+        model_path: Path to the PyTorch .pt weights
+        backend: One of BACKENDS
+        imgsz: Inference size the exported model is built for
+        cache_dir: Directory for exported models (defaults to DEFAULT_CACHE_DIR)
+    """
+    from ultralytics import YOLO
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == 'pytorch':
+        model = YOLO(model_path)
+        model.fuse()
+        return model
+
+    model_path = resolve_weights(model_path)
+    target = cached_model_path(model_path, backend, imgsz, cache_dir)
+    if not os.path.exists(target):
+        _export(model_path, backend, imgsz, target)
+    else:
+        print(f"Using cached {backend} model: {target}")
+    return YOLO(target, task='pose')
@@ -0,0 +1,187 @@
+"""
+Shared batched inference for several cameras or drones on one pose model.
+
+Each registered source gets a client that looks like a YOLO model to
+HeadDetector. Frames submitted by the clients are collected by one worker
+thread and run through the model as a single batch, either when every
+active source has a frame waiting or when the oldest request hits the
+max-wait deadline, so a slow source never starves the others.
+
+    service = BatchInferenceService(load_pose_model('yolov8n-pose.pt'))
+    service.start()
+    tello_detector = HeadDetector(drone=drone, inference_client=service.client('tello'))
+    webcam_detector = HeadDetector(inference_client=service.client('webcam'))
+"""
+
+import threading
+import time
+
+
+class _Request:
+    __slots__ = ('source_id', 'frame', 'imgsz', 'conf', 'submitted', 'result', 'done')
+
+    def __init__(self, source_id, frame, imgsz, conf):
+        self.source_id = source_id
+        self.frame = frame
+        self.imgsz = imgsz
+        self.conf = conf
+        self.submitted = time.time()
+        self.result = None
+        self.done = threading.Event()
+
+
+class InferenceClient:
+    """Per-source handle with the same call signature as an Ultralytics model"""
+
+    def __init__(self, service, source_id):
+        self.service = service
+        self.source_id = source_id
+
+    def __call__(self, frame, verbose=False, conf=0.3, imgsz=640, **kwargs):
+        result = self.service.infer(self.source_id, frame, imgsz=imgsz, conf=conf)
+        return [result] if result is not None else []
+
+
+class BatchInferenceService:
+    """Runs the latest frame of every registered source through the model as one batch"""
+
+    def __init__(self, model, max_batch=8, max_wait=0.02, timeout=2.0):
+        """
+        Args:
+            model: Loaded Ultralytics pose model (any backend)
+            max_batch: Largest batch passed to the model
+            max_wait: Longest a request waits for other sources before its batch runs (s)
+            timeout: How long a client blocks for its result before giving up (s)
+        """
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._pending = {}  # source_id -> newest _Request
+        self._sources = {}  # source_id -> per-source counters
+        self._running = False
+        self._thread = None
+
+        self.batches = 0
+        self.frames = 0
+        self.batch_time = 0.0
+        self._started = None
+
+    def client(self, source_id):
+        """Register a source and return its model-like client"""
+        with self._cond:
+            self._sources.setdefault(source_id, {'served': 0, 'superseded': 0, 'timeouts': 0})
+        return InferenceClient(self, source_id)
+
+    def unregister(self, source_id):
+        with self._cond:
+            self._sources.pop(source_id, None)
+            request = self._pending.pop(source_id, None)
+        if request is not None:
+            request.done.set()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._started = time.time()
+        self._thread = threading.Thread(target=self._run, name='batch-inference', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify_all()
+        for request in pending:
+            request.done.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def infer(self, source_id, frame, imgsz=640, conf=0.3):
+        """Queue a frame for source_id and block until its result is ready (None on timeout)"""
+        request = _Request(source_id, frame, imgsz, conf)
+        with self._cond:
+            previous = self._pending.get(source_id)
+            if previous is not None:
+                # Latest frame wins; the older waiter gets no result
+                self._sources[source_id]['superseded'] += 1
+                previous.done.set()
+            self._pending[source_id] = request
+            self._cond.notify_all()
+
+        if not request.done.wait(self.timeout):
+            with self._cond:
+                if self._pending.get(source_id) is request:
+                    del self._pending[source_id]
+                if source_id in self._sources:
+                    self._sources[source_id]['timeouts'] += 1
+            return None
+        return request.result
+
+    def _collect_batch(self):
+        """Wait for a full round of sources or the deadline; returns the requests to run"""
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait(0.1)
+            if not self._running:
+                return []
+
+            oldest = min(r.submitted for r in self._pending.values())
+            deadline = oldest + self.max_wait
+            while self._running:
+                if len(self._pending) >= min(len(self._sources), self.max_batch):
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Oldest requests first; a batch shares one imgsz/conf setting
+            ordered = sorted(self._pending.values(), key=lambda r: r.submitted)
+            head = ordered[0]
+            batch = [r for r in ordered if r.imgsz == head.imgsz and r.conf == head.conf][:self.max_batch]
+            for request in batch:
+                del self._pending[request.source_id]
+            return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            started = time.time()
+            try:
+                results = self.model([r.frame for r in batch], verbose=False,
+                                     conf=batch[0].conf, imgsz=batch[0].imgsz)
+            except Exception as e:
+                print(f'Batch inference failed: {e}')
+                results = [None] * len(batch)
+            elapsed = time.time() - started
+
+            with self._cond:
+                self.batches += 1
+                self.frames += len(batch)
+                self.batch_time += elapsed
+                for request, result in zip(batch, results):
+                    request.result = result
+                    if request.source_id in self._sources:
+                        self._sources[request.source_id]['served'] += 1
+            for request in batch:
+                request.done.set()
+
+    def get_stats(self):
+        with self._cond:
+            uptime = time.time() - self._started if self._started else 0.0
+            return {
+                'sources': {k: dict(v) for k, v in self._sources.items()},
+                'batches': self.batches,
+                'frames': self.frames,
+                'avg_batch_size': round(self.frames / self.batches, 2) if self.batches else 0.0,
+                'avg_batch_ms': round(self.batch_time / self.batches * 1000, 2) if self.batches else 0.0,
+                'aggregate_fps': round(self.frames / uptime, 1) if uptime else 0.0,
+            }
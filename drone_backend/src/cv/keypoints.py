@@ -0,0 +1,141 @@
+"""
+Vectorized head estimates from YOLO pose keypoints.
+
+Works on the (n, 17, 3) array from `results[0].keypoints.data` (x, y, conf for
+every person), so the whole result is copied off the device once and every
+person's head center, size and confidence come out of one NumPy pass. Small
+groups, including the usual single subject, take a scalar path instead: with
+five keypoints per person the fixed cost of the array operations is several
+times the work itself.
+"""
+
+import math
+
+import numpy as np
+
+NOSE, LEFT_EYE, RIGHT_EYE, LEFT_EAR, RIGHT_EAR = range(5)
+
+HEAD_WIDTH_PER_EYE_DISTANCE = 2.0
+HEAD_WIDTH_PER_EAR_DISTANCE = 1.1
+HEAD_WIDTH_PER_NOSE_EYE_DISTANCE = 3.5
+DEFAULT_HEAD_SIZE = 100
+
+# Up to this many people a plain Python pass per person beats the array operations,
+# whose fixed cost dominates when there are only five keypoints each
+SCALAR_MAX_PEOPLE = 32
+
+
+def head_estimates(kp_data, conf_threshold=0.5):
+    """
+    Head center, size and confidence for every person
+
+    Args:
+        kp_data: (n, 17, 3) array of x, y, confidence
+        conf_threshold: Keypoints below this confidence count as missing
+
+    Returns a dict of arrays:
+        center: (n, 2) nose, else the midpoint of the visible eyes, else of the ears
+        size: (n,) head width from eye distance, else ear distance, else
+              nose-to-eye distance, else DEFAULT_HEAD_SIZE
+        confidence: (n,) mean confidence of the five face keypoints
+        valid: (n,) whether any face keypoint was usable for the center
+    """
+    kp_data = np.asarray(kp_data, dtype=np.float32).reshape(-1, 17, 3)
+    if 0 < len(kp_data) <= SCALAR_MAX_PEOPLE:
+        return _scalar_head_estimates(kp_data, conf_threshold)
+    return _vectorized_head_estimates(kp_data, conf_threshold)
+
+
+def _vectorized_head_estimates(kp_data, conf_threshold):
+    """head_estimates for every person in one NumPy pass over the (n, 17, 3) array"""
+    xy = kp_data[:, :5, :2]
+    conf = kp_data[:, :5, 2]
+    visible = (conf >= conf_threshold) & (xy > 0).all(axis=2)
+
+    # Midpoints of the visible eyes and of the visible ears in one pass: (n, 2 pairs, 2)
+    pairs = xy[:, 1:5].reshape(-1, 2, 2, 2)
+    pair_v = visible[:, 1:5].reshape(-1, 2, 2)
+    pair_count = pair_v.sum(axis=2)
+    midpoints = (pairs * pair_v[..., None]).sum(axis=2) / np.maximum(pair_count, 1)[..., None]
+    spans = np.sqrt(((pairs[:, :, 1] - pairs[:, :, 0]) ** 2).sum(axis=2))
+
+    nose_v = visible[:, NOSE]
+    has_eye = pair_count[:, 0] > 0
+
+    # Center: nose -> midpoint of visible eye(s) -> midpoint of visible ear(s)
+    center = np.where(nose_v[:, None], xy[:, NOSE],
+                      np.where(has_eye[:, None], midpoints[:, 0], midpoints[:, 1]))
+
+    # Size: eye distance -> ear distance -> nose to nearest visible eye -> default
+    nose_eye = np.sqrt(((xy[:, 1:3] - xy[:, :1]) ** 2).sum(axis=2))
+    nose_eye = np.where(pair_v[:, 0], nose_eye, np.inf).min(axis=1)
+    size = np.where(nose_v & has_eye, nose_eye * HEAD_WIDTH_PER_NOSE_EYE_DISTANCE, DEFAULT_HEAD_SIZE)
+    size = np.where(pair_count[:, 1] == 2, spans[:, 1] * HEAD_WIDTH_PER_EAR_DISTANCE, size)
+    size = np.where(pair_count[:, 0] == 2, spans[:, 0] * HEAD_WIDTH_PER_EYE_DISTANCE, size)
+
+    return {
+        'center': center,
+        'size': size,
+        'confidence': conf.mean(axis=1),
+        'valid': nose_v | (pair_count > 0).any(axis=1),
+    }
+
+
+def _scalar_head_estimates(kp_data, conf_threshold):
+    """head_estimates computed person by person, with one array allocation for the result"""
+    if len(kp_data) == 1:
+        # The usual case when following one subject; skips building rows
+        cx, cy, size, confidence, valid = _face_values(kp_data[0, :5].tolist(), conf_threshold)
+        values = np.array([cx, cy, size, confidence], dtype=np.float32)
+        return {
+            'center': values[None, :2],
+            'size': values[2:3],
+            'confidence': values[3:],
+            'valid': np.array([valid]),
+        }
+    rows = [_face_values(face, conf_threshold) for face in kp_data[:, :5].tolist()]
+    values = np.array(rows, dtype=np.float32)
+    return {
+        'center': values[:, :2],
+        'size': values[:, 2],
+        'confidence': values[:, 3],
+        'valid': values[:, 4] > 0,
+    }
+
+
+def _face_values(face, conf_threshold):
+    """(center_x, center_y, size, confidence, valid) from one person's five (x, y, conf) face keypoints"""
+    (nx, ny, nc), (lx, ly, lc), (rx, ry, rc), (lex, ley, lec), (rex, rey, rec) = face
+    nose_v = nc >= conf_threshold and nx > 0 and ny > 0
+    left_v = lc >= conf_threshold and lx > 0 and ly > 0
+    right_v = rc >= conf_threshold and rx > 0 and ry > 0
+    left_ear_v = lec >= conf_threshold and lex > 0 and ley > 0
+    right_ear_v = rec >= conf_threshold and rex > 0 and rey > 0
+
+    # Center: nose -> midpoint of visible eye(s) -> midpoint of visible ear(s)
+    if nose_v:
+        center = (nx, ny)
+    elif left_v and right_v:
+        center = ((lx + rx) / 2, (ly + ry) / 2)
+    elif left_v or right_v:
+        center = (lx, ly) if left_v else (rx, ry)
+    elif left_ear_v and right_ear_v:
+        center = ((lex + rex) / 2, (ley + rey) / 2)
+    elif left_ear_v or right_ear_v:
+        center = (lex, ley) if left_ear_v else (rex, rey)
+    else:
+        center = (0.0, 0.0)
+
+    # Size: eye distance -> ear distance -> nose to nearest visible eye -> default
+    if left_v and right_v:
+        size = math.hypot(rx - lx, ry - ly) * HEAD_WIDTH_PER_EYE_DISTANCE
+    elif left_ear_v and right_ear_v:
+        size = math.hypot(rex - lex, rey - ley) * HEAD_WIDTH_PER_EAR_DISTANCE
+    elif nose_v and (left_v or right_v):
+        ex, ey = (lx, ly) if left_v else (rx, ry)
+        size = math.hypot(ex - nx, ey - ny) * HEAD_WIDTH_PER_NOSE_EYE_DISTANCE
+    else:
+        size = DEFAULT_HEAD_SIZE
+
+    confidence = (nc + lc + rc + lec + rec) / 5
+    return center[0], center[1], size, confidence, nose_v or left_v or right_v or left_ear_v or right_ear_v
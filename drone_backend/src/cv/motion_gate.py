@@ -0,0 +1,97 @@
+"""
+Motion gate that skips the pose model while the tracked head is static.
+
+Each frame is shrunk to a small grayscale thumbnail in preallocated buffers
+and compared with the thumbnail from the last real inference, inside and
+around the head region. If nothing there changed, the tracker's estimate is
+still valid and the YOLO pass can be skipped, up to a maximum staleness.
+"""
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap frame-differencing check around the last head position"""
+
+    def __init__(self, thumb_width=96, threshold=6.0, roi_margin=2.5, max_staleness=1.0):
+        """
+        Args:
+            thumb_width: Width of the grayscale thumbnail the difference is computed on
+            threshold: Mean absolute difference (0-255) above which the region counts as moving
+            roi_margin: Region checked, as a multiple of the head size around its center
+            max_staleness: Longest time (s) inference may be skipped in a row
+        """
+        self.thumb_width = thumb_width
+        self.threshold = threshold
+        self.roi_margin = roi_margin
+        self.max_staleness = max_staleness
+
+        self._small = None
+        self._gray = None
+        self._reference = None
+        self._diff = None
+        self._scale = 1.0
+        self.reference_time = None
+        self.last_score = 0.0
+        self.stats = {'checks': 0, 'static': 0, 'moving': 0, 'stale': 0}
+
+    def _thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        thumb_h = max(1, int(round(h * self.thumb_width / w)))
+        if self._gray is None or self._gray.shape != (thumb_h, self.thumb_width):
+            self._small = np.empty((thumb_h, self.thumb_width, 3), dtype=np.uint8)
+            self._gray = np.empty((thumb_h, self.thumb_width), dtype=np.uint8)
+            self._reference = np.empty_like(self._gray)
+            self._diff = np.empty_like(self._gray)
+            self._scale = self.thumb_width / w
+            self.reference_time = None
+        cv2.resize(frame, (self.thumb_width, thumb_h), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return self._gray
+
+    def set_reference(self, frame, timestamp):
+        """Remember the frame the pose model just ran on"""
+        gray = self._thumbnail(frame)
+        np.copyto(self._reference, gray)
+        self.reference_time = timestamp
+
+    def is_static(self, frame, detection, timestamp):
+        """
+        True if the region around the detected head has not changed since the last inference
+
+        detection: Head detection with full-frame 'x', 'y' and 'size'
+        """
+        if detection is None or self.reference_time is None:
+            return False
+        self.stats['checks'] += 1
+        if timestamp - self.reference_time >= self.max_staleness:
+            self.stats['stale'] += 1
+            return False
+
+        gray = self._thumbnail(frame)
+        if self.reference_time is None:
+            # Resolution changed, reference was dropped
+            return False
+
+        half = detection['size'] * self.roi_margin / 2 * self._scale
+        cx = detection['x'] * self._scale
+        cy = detection['y'] * self._scale
+        th, tw = gray.shape
+        x0, x1 = int(max(cx - half, 0)), int(min(cx + half + 1, tw))
+        y0, y1 = int(max(cy - half, 0)), int(min(cy + half + 1, th))
+        if x1 <= x0 or y1 <= y0:
+            return False
+
+        cv2.absdiff(gray, self._reference, dst=self._diff)
+        self.last_score = float(self._diff[y0:y1, x0:x1].mean())
+        static = self.last_score < self.threshold
+        self.stats['static' if static else 'moving'] += 1
+        return static
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        checks = stats['checks']
+        stats['hit_rate'] = round(stats['static'] / checks, 3) if checks else 0.0
+        stats['last_score'] = round(self.last_score, 2)
+        return stats
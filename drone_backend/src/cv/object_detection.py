@@ -1,35 +1,190 @@
-import cv2
-from ultralytics import YOLO
+"""
+General object detection next to the head tracker.
 
-def run_model(object_num=0, conf_threshold=0.5):
-    model = YOLO("yolo11n.pt")
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+ObjectDetector loads the model once and runs on the CPU with no display.
+It can consume a FrameSource on its own (stream) or attach to a running
+HeadDetector and take frames from its capture step, so both models share
+one camera loop. Attached, it works on its own thread: a frame is copied
+into a reused buffer only when the worker is free, and results are kept as
+the latest set plus a generator that yields every new one.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from src.cv.frame_source import create_frame_source
+
+
+class ObjectDetector:
+    """YOLO detection model with class filtering and a background worker"""
+
+    def __init__(self, model_path='yolo11n.pt', classes=None, conf_threshold=0.5, imgsz=640, device='cpu'):
+        """
+        Args:
+            model_path: YOLO detection weights
+            classes: Class names or ids to keep; None keeps every class
+            conf_threshold: Minimum detection confidence
+            imgsz: Inference size
+            device: Torch device; defaults to CPU so it runs on any host
+        """
+        from ultralytics import YOLO
+
+        print(f"Loading object detection model: {model_path}")
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.class_ids = self._class_ids(classes)
+        self.conf_threshold = conf_threshold
+        self.imgsz = imgsz
+        self.device = device
+
+        self._cond = threading.Condition()
+        self._buffer = None
+        self._pending = None
+        self._busy = False
+        self._latest = None
+        self._result_seq = 0
+        self._stopped = threading.Event()
+        self.thread = None
+        self.stats = {'submitted': 0, 'skipped_busy': 0, 'processed': 0, 'avg_latency_ms': 0.0}
+
+    def _class_ids(self, classes):
+        if classes is None:
+            return None
+        by_name = {name: class_id for class_id, name in self.names.items()}
+        ids = []
+        for c in classes:
+            if isinstance(c, int) or str(c).isdigit():
+                ids.append(int(c))
+            elif c in by_name:
+                ids.append(by_name[c])
+            else:
+                print(f"Unknown object class '{c}', ignoring")
+        return ids
+
+    def detect(self, image):
+        """List of {'class_id', 'label', 'confidence', 'box'} for one BGR image"""
+        results = self.model(image, verbose=False, conf=self.conf_threshold, imgsz=self.imgsz,
+                             classes=self.class_ids, device=self.device)
+        if not results or results[0].boxes is None or len(results[0].boxes) == 0:
+            return []
+        data = results[0].boxes.data.cpu().numpy()  # (n, 6): x0, y0, x1, y1, conf, class
+        return [
+            {
+                'class_id': int(row[5]),
+                'label': self.names[int(row[5])],
+                'confidence': round(float(row[4]), 3),
+                'box': [round(float(v), 1) for v in row[:4]],
+            }
+            for row in data
+        ]
+
+    def stream(self, source, stop_flag=None):
+        """Yield (frame, detections) for every Frame read from an opened FrameSource"""
+        while not (stop_flag is not None and stop_flag.is_set()):
+            frame = source.read()
+            if frame is None:
+                break
+            yield frame, self.detect(frame.image)
+
+    def attach(self, head_detector):
+        """Take frames from head_detector's loop and detect on a worker thread"""
+        head_detector.frame_listeners.append(self.submit)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._worker, name='object-detection', daemon=True)
+            self.thread.start()
+
+    def submit(self, frame):
+        """Hand a Frame to the worker; dropped if it is still busy with the previous one"""
+        with self._cond:
+            self.stats['submitted'] += 1
+            if self._busy:
+                self.stats['skipped_busy'] += 1
+                return
+            if self._buffer is None or self._buffer.shape != frame.image.shape:
+                self._buffer = np.empty_like(frame.image)
+            # The head tracker draws overlays on its frame in place, so work on a copy
+            np.copyto(self._buffer, frame.image)
+            self._pending = frame._replace(image=self._buffer)
+            self._busy = True
+            self._cond.notify_all()
+
+    def _worker(self):
+        while not self._stopped.is_set():
+            with self._cond:
+                if self._pending is None:
+                    self._cond.wait(timeout=0.5)
+                frame, self._pending = self._pending, None
+            if frame is None:
+                continue
+
+            started = time.perf_counter()
+            try:
+                objects = self.detect(frame.image)
+            except Exception as e:
+                print(f'Object detection failed: {e}')
+                objects = []
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            with self._cond:
+                self._latest = {'seq': frame.seq, 'timestamp': frame.timestamp, 'objects': objects}
+                self._result_seq += 1
+                self._busy = False
+                self.stats['processed'] += 1
+                self.stats['avg_latency_ms'] += (latency_ms - self.stats['avg_latency_ms']) * 0.1
+                self._cond.notify_all()
+
+    def latest(self):
+        """Most recent {'seq', 'timestamp', 'objects'} from the worker, or None"""
+        with self._cond:
+            return self._latest
+
+    def detections(self, stop_flag=None, timeout=1.0):
+        """Yield every new result from the attached worker"""
+        last_seq = 0
+        while not self._stopped.is_set() and not (stop_flag is not None and stop_flag.is_set()):
+            with self._cond:
+                if self._result_seq == last_seq:
+                    self._cond.wait(timeout)
+                if self._result_seq == last_seq:
+                    continue
+                last_seq = self._result_seq
+                result = self._latest
+            yield result
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+        stats['avg_latency_ms'] = round(stats['avg_latency_ms'], 2)
+        stats['classes'] = None if self.class_ids is None else [self.names[i] for i in self.class_ids]
+        return stats
+
+
+def run_model(object_num=0, conf_threshold=0.5, source=None, classes=None):
+    """Print detections from a frame source (webcam by default) until it ends"""
+    detector = ObjectDetector(conf_threshold=conf_threshold, classes=classes)
+    frame_source = create_frame_source(source)
+    if not frame_source.open():
         print('Error: could not open video device.')
         return
-    
-    try:
-        while True:
-            ret, frame = cap.read() 
-            if not ret:
-                print('Error: could not read frame from video device.')
-                break
-            results = model(frame, stream=True, device='mps', conf=conf_threshold)
-            for r in results:
-                boxes = r.boxes     # gets the coordinates, confidence and class of the detected objects
-                frame = r.plot()    # plots the box and labels
 
-            cv2.imshow('YOLOv11n Detection', frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-    
+    try:
+        for frame, objects in detector.stream(frame_source):
+            labels = ', '.join(f"{o['label']} {o['confidence']:.2f}" for o in objects)
+            print(f"frame {frame.seq}: {labels or 'nothing'}")
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(f'An error occurred: {e}')
-    
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
-        print('camera now closed')
-    
+        frame_source.release()
+
+
 if __name__ == "__main__":
-    run_model(conf_threshold=0.5)
\ No newline at end of file
+    run_model(conf_threshold=0.5)
@@ -0,0 +1,141 @@
+"""
+Sparse Lucas-Kanade propagation of face keypoints between pose-model passes.
+
+After an inference the visible face keypoints are followed frame to frame
+with pyramidal LK on a small grayscale crop around the head. Each step is
+checked forward-backward: points that do not track back to where they
+started are dropped, and when too few survive the tracker reports itself
+lost so the caller can run a fresh inference.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+FACE_KEYPOINTS = 5  # nose, eyes, ears
+
+
+class KeypointFlowTracker:
+    """Follows the face keypoints of one head between inferences"""
+
+    def __init__(self, win_size=15, max_level=2, fb_threshold=1.5, min_points=2,
+                 roi_scale=3.0, roi_min_size=64):
+        """
+        Args:
+            win_size: LK search window side in pixels
+            max_level: Pyramid levels above the base image
+            fb_threshold: Largest forward-backward error (px) for a point to be kept
+            min_points: Fewer surviving points than this means tracking is lost
+            roi_scale: Crop side as a multiple of the head size
+            roi_min_size: Smallest crop side in pixels
+        """
+        self.lk_params = {
+            'winSize': (win_size, win_size),
+            'maxLevel': max_level,
+            'criteria': (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        }
+        self.fb_threshold = fb_threshold
+        self.min_points = min_points
+        self.roi_scale = roi_scale
+        self.roi_min_size = roi_min_size
+
+        self.keypoints = None
+        self._prev_gray = None
+        self._origin = None
+        self._head_size = None
+        self.stats = {'started': 0, 'tracked': 0, 'lost': 0, 'avg_fb_error': 0.0, 'avg_ms': 0.0}
+
+    @property
+    def active(self):
+        return self.keypoints is not None
+
+    def _bounds(self, points, shape):
+        h, w = shape[:2]
+        center = points.mean(axis=0)
+        side = int(max(self._head_size * self.roi_scale, self.roi_min_size))
+        x0 = int(min(max(center[0] - side / 2, 0), max(w - side, 0)))
+        y0 = int(min(max(center[1] - side / 2, 0), max(h - side, 0)))
+        return x0, y0, min(x0 + side, w), min(y0 + side, h)
+
+    def _gray_crop(self, frame, bounds):
+        x0, y0, x1, y1 = bounds
+        return cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+
+    def _visible(self, keypoints):
+        face = keypoints[:FACE_KEYPOINTS]
+        return (face[:, 0] > 0) & (face[:, 1] > 0)
+
+    def start(self, frame, keypoints, head_size):
+        """Begin following keypoints ((17, 2) full-frame) measured on frame"""
+        visible = self._visible(keypoints)
+        if visible.sum() < self.min_points:
+            self.reset()
+            return
+        self.keypoints = keypoints.astype(np.float32)
+        self._head_size = float(head_size)
+        bounds = self._bounds(self.keypoints[:FACE_KEYPOINTS][visible], frame.shape)
+        self._origin = bounds
+        self._prev_gray = self._gray_crop(frame, bounds)
+        self.stats['started'] += 1
+
+    def track(self, frame):
+        """Keypoints moved onto frame, or None if tracking was lost"""
+        if not self.active:
+            return None
+        started = time.perf_counter()
+
+        visible = np.flatnonzero(self._visible(self.keypoints))
+        x0, y0 = self._origin[:2]
+        next_gray = self._gray_crop(frame, self._origin)
+        if next_gray.shape != self._prev_gray.shape:
+            return self._lost()
+
+        p0 = (self.keypoints[visible] - (x0, y0)).reshape(-1, 1, 2).astype(np.float32)
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, next_gray, p0, None, **self.lk_params)
+        if p1 is None:
+            return self._lost()
+        p0_back, status_back, _ = cv2.calcOpticalFlowPyrLK(next_gray, self._prev_gray, p1, None, **self.lk_params)
+        if p0_back is None:
+            return self._lost()
+
+        fb_error = np.linalg.norm((p0 - p0_back).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (status_back.ravel() == 1) & (fb_error < self.fb_threshold)
+        if good.sum() < self.min_points:
+            return self._lost()
+
+        keypoints = self.keypoints.copy()
+        moved = p1.reshape(-1, 2) + (x0, y0)
+        keypoints[visible[good]] = moved[good]
+        keypoints[visible[~good]] = 0  # failed points count as not visible from here on
+
+        # Re-center the crop on the new position for the next step
+        self.keypoints = keypoints
+        bounds = self._bounds(keypoints[:FACE_KEYPOINTS][self._visible(keypoints)], frame.shape)
+        if bounds == self._origin:
+            self._prev_gray = next_gray
+        else:
+            self._origin = bounds
+            self._prev_gray = self._gray_crop(frame, bounds)
+
+        self.stats['tracked'] += 1
+        self.stats['avg_fb_error'] += (float(fb_error[good].mean()) - self.stats['avg_fb_error']) * 0.1
+        self.stats['avg_ms'] += ((time.perf_counter() - started) * 1000 - self.stats['avg_ms']) * 0.1
+        return keypoints
+
+    def _lost(self):
+        self.stats['lost'] += 1
+        self.reset()
+        return None
+
+    def reset(self):
+        self.keypoints = None
+        self._prev_gray = None
+        self._origin = None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['avg_fb_error'] = round(stats['avg_fb_error'], 3)
+        stats['avg_ms'] = round(stats['avg_ms'], 3)
+        stats['active'] = self.active
+        return stats
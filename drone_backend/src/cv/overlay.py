@@ -0,0 +1,134 @@
+"""
+Overlay compositor for the tracking stream.
+
+The rule-of-thirds grid, deadzone circles and border never change for a given
+resolution, so they are rendered once into a cached layer and copied onto
+each frame with a single masked copy. Per-frame annotations (head box,
+keypoints, status text) are only drawn while someone is watching the stream,
+and can be left to the client entirely by consuming the detection metadata
+channel instead.
+"""
+
+import cv2
+import numpy as np
+
+
+class OverlayCompositor:
+    """Draws the static and dynamic tracking overlays"""
+
+    def __init__(self, client_side_annotations=False):
+        """
+        client_side_annotations: Skip server-side head/keypoint/status drawing;
+            clients draw them from the published detection metadata
+        """
+        self.client_side_annotations = client_side_annotations
+        self.is_watched = lambda: True
+        self._layers = {}
+        self.stats = {'rendered': 0, 'skipped_unwatched': 0}
+
+    def _static_layer(self, h, w):
+        """Cached (layer, mask) with the grid, deadzone and border for an h x w square"""
+        key = (h, w)
+        cached = self._layers.get(key)
+        if cached is not None:
+            return cached
+
+        layer = np.zeros((h, w, 3), dtype=np.uint8)
+        center_x, center_y = w // 2, h // 2
+        deadzone_radius = w // 8  # MUCH SMALLER deadzone (was // 4)
+
+        grid_color = (100, 100, 100)  # Subtle gray
+        x_third = w // 3
+        y_third = h // 3
+
+        cv2.line(layer, (x_third, 0), (x_third, h), grid_color, 1)
+        cv2.line(layer, (x_third * 2, 0), (x_third * 2, h), grid_color, 1)
+
+        cv2.line(layer, (0, y_third), (w, y_third), grid_color, 1)
+        cv2.line(layer, (0, y_third * 2), (w, y_third * 2), grid_color, 1)
+
+        cv2.circle(layer, (center_x, center_y), deadzone_radius, (0, 255, 255), 2)
+
+        cv2.circle(layer, (center_x, center_y), 5, (0, 255, 255), -1)
+
+        cv2.circle(layer, (center_x, center_y), deadzone_radius, (0, 255, 0), 1)
+        cv2.rectangle(layer, (0, 0), (w - 1, h - 1), (255, 255, 255), 2)
+
+        # Every overlay color has a non-zero channel, so drawn pixels are exactly the non-black ones
+        mask = layer.any(axis=2)[:, :, None]
+        self._layers[key] = (layer, mask)
+        return layer, mask
+
+    def apply_static(self, square_frame):
+        h, w = square_frame.shape[:2]
+        layer, mask = self._static_layer(h, w)
+        np.copyto(square_frame, layer, where=mask)
+
+    def draw_annotations(self, frame, geometry, detection, status_text, current_fps):
+        """Head box, keypoints, status and FPS text in full-frame coordinates"""
+        if detection is not None:
+            x_head_center = detection['x']
+            y_head_center = detection['y']
+            half_size = detection['size'] // 2
+            x_min = x_head_center - half_size
+            x_max = x_head_center + half_size
+            y_min = y_head_center - half_size
+            y_max = y_head_center + half_size
+
+            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (0, 255, 0), 3)
+            cv2.circle(frame, (x_head_center, y_head_center), 5, (0, 255, 0), -1)
+            cv2.line(frame, (x_head_center, y_head_center),
+                     (geometry['x_center'], geometry['y_center']), (0, 255, 0), 2)
+
+            face = detection['keypoints'][:5]
+            for x, y in face[(face[:, 0] > 0) & (face[:, 1] > 0)].astype(int).tolist():
+                cv2.circle(frame, (x, y), 3, (255, 0, 0), -1)
+
+            cv2.putText(frame, f"Head: {detection['size']}px | {status_text()}",
+                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        else:
+            cv2.putText(frame, "No head detected", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+
+        # Display FPS
+        cv2.putText(frame, f"FPS: {current_fps:.0f}", (10, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+
+    def render(self, frame, square_frame, geometry, detection, status_text, current_fps):
+        """
+        Composite overlays onto the frame in place
+
+        status_text: Callable producing the status string, only called when it is drawn
+        """
+        if not self.is_watched():
+            self.stats['skipped_unwatched'] += 1
+            return
+        self.stats['rendered'] += 1
+        self.apply_static(square_frame)
+        if not self.client_side_annotations:
+            self.draw_annotations(frame, geometry, detection, status_text, current_fps)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['client_side_annotations'] = self.client_side_annotations
+        stats['cached_layers'] = len(self._layers)
+        return stats
+
+
+def detection_metadata(detection, geometry):
+    """JSON-friendly detection in square-frame coordinates for client-side drawing"""
+    if detection is None:
+        return {'face_detected': False}
+    x_offset = geometry['x_offset']
+    keypoints = [
+        [round(float(kp[0]) - x_offset, 1), round(float(kp[1]), 1)] if kp[0] > 0 and kp[1] > 0 else None
+        for kp in detection['keypoints'][:5]
+    ]
+    return {
+        'face_detected': True,
+        'x': detection['x'] - x_offset,
+        'y': detection['y'],
+        'size': detection['size'],
+        'keypoints': keypoints,
+        'frame_size': [geometry['square_w'], geometry['square_h']],
+    }
@@ -0,0 +1,254 @@
+"""
+Multi-person identity tracking so the drone stays locked on one subject.
+
+ByteTrack-style association: confident detections are matched to existing
+tracks first, then low-confidence detections get a second chance against the
+tracks that are still unmatched. The cost combines box IoU with the distance
+between face keypoints and is computed for all track/detection pairs in one
+vectorized NumPy pass.
+"""
+
+import threading
+
+import numpy as np
+
+FACE_KEYPOINTS = 5  # nose, eyes, ears
+NUM_KEYPOINTS = 17  # COCO pose layout
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between (n, 4) and (m, 4) xyxy boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def keypoint_distance_matrix(kps_a, kps_b, boxes_a):
+    """
+    Mean distance between face keypoints visible in both, normalized by the
+    diagonal of the track box. Pairs with no shared keypoint get 1.0.
+    """
+    if len(kps_a) == 0 or len(kps_b) == 0:
+        return np.ones((len(kps_a), len(kps_b)))
+    a = kps_a[:, None, :FACE_KEYPOINTS, :]
+    b = kps_b[None, :, :FACE_KEYPOINTS, :]
+    visible = (a[..., 0] > 0) & (b[..., 0] > 0)
+    dist = np.linalg.norm(a - b, axis=-1) * visible
+    count = visible.sum(axis=-1)
+    mean = dist.sum(axis=-1) / np.maximum(count, 1)
+    diag = np.hypot(boxes_a[:, 2] - boxes_a[:, 0], boxes_a[:, 3] - boxes_a[:, 1])
+    normalized = mean / np.maximum(diag, 1.0)[:, None]
+    return np.where(count > 0, np.minimum(normalized, 1.0), 1.0)
+
+
+def greedy_assign(cost, max_cost):
+    """Match rows to columns lowest cost first; returns list of (row, col)"""
+    matches = []
+    if cost.size == 0:
+        return matches
+    cost = cost.copy()
+    for _ in range(min(cost.shape)):
+        row, col = np.unravel_index(np.argmin(cost), cost.shape)
+        if cost[row, col] > max_cost:
+            break
+        matches.append((int(row), int(col)))
+        cost[row, :] = np.inf
+        cost[:, col] = np.inf
+    return matches
+
+
+class Track:
+    __slots__ = ('track_id', 'box', 'keypoints', 'score', 'hits', 'missed', 'det_index')
+
+    def __init__(self, track_id, box, keypoints, score, det_index):
+        self.track_id = track_id
+        self.det_index = det_index  # detection matched on the latest pass, -1 if missed
+        self.box = box
+        self.keypoints = keypoints
+        self.score = score
+        self.hits = 1
+        self.missed = 0
+
+    def to_dict(self):
+        return {
+            'id': self.track_id,
+            'box': [round(float(v), 1) for v in self.box],
+            'score': round(float(self.score), 3),
+            'hits': self.hits,
+            'missed': self.missed,
+        }
+
+
+class PersonTracker:
+    """Gives every detected person a persistent ID and picks the target to follow"""
+
+    def __init__(self, high_thresh=0.5, max_cost=0.8, keypoint_weight=0.5, max_missed=15, lock_grace=15):
+        """
+        Args:
+            high_thresh: Detections at or above this confidence are associated first
+            max_cost: Largest association cost accepted as a match
+            keypoint_weight: Weight of the face-keypoint distance in the cost
+            max_missed: Inference passes a track survives without a match
+            lock_grace: Inference passes to follow nobody after the locked track
+                is dropped, before picking a new subject automatically
+        """
+        self.high_thresh = high_thresh
+        self.max_cost = max_cost
+        self.keypoint_weight = keypoint_weight
+        self.max_missed = max_missed
+        self.lock_grace = lock_grace
+
+        self.tracks = []
+        self.next_id = 1
+        self.locked_id = None
+        self.selected_id = None
+        self.lock_lost_id = None
+        self._lock_lost_passes = 0
+        self._lock = threading.Lock()
+
+    def _cost(self, tracks, boxes, keypoints):
+        track_boxes = np.array([t.box for t in tracks])
+        track_kps = np.array([t.keypoints for t in tracks])
+        iou = iou_matrix(track_boxes, boxes)
+        kp_dist = keypoint_distance_matrix(track_kps, keypoints, track_boxes)
+        return (1.0 - iou) * (1 - self.keypoint_weight) + kp_dist * self.keypoint_weight
+
+    def _associate(self, tracks, det_indices, boxes, keypoints):
+        if not tracks or len(det_indices) == 0:
+            return [], list(range(len(tracks))), list(det_indices)
+        cost = self._cost(tracks, boxes[det_indices], keypoints[det_indices])
+        matches = greedy_assign(cost, self.max_cost)
+        matched_tracks = {r for r, _ in matches}
+        matched_dets = {c for _, c in matches}
+        pairs = [(r, det_indices[c]) for r, c in matches]
+        unmatched_tracks = [i for i in range(len(tracks)) if i not in matched_tracks]
+        unmatched_dets = [det_indices[i] for i in range(len(det_indices)) if i not in matched_dets]
+        return pairs, unmatched_tracks, unmatched_dets
+
+    def update(self, boxes, scores, keypoints):
+        """
+        Associate one inference pass with the existing tracks
+
+        Args:
+            boxes: (n, 4) xyxy person boxes in full-frame pixels
+            scores: (n,) detection confidences
+            keypoints: (n, 17, 2) keypoints in full-frame pixels
+        Returns the current list of tracks.
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        # Explicit keypoint count so a pass with nobody in it reshapes to (0, 17, 2)
+        keypoints = np.asarray(keypoints, dtype=np.float32).reshape(len(boxes), NUM_KEYPOINTS, 2)
+
+        with self._lock:
+            high = np.flatnonzero(scores >= self.high_thresh)
+            low = np.flatnonzero(scores < self.high_thresh)
+
+            pairs, unmatched, unmatched_high = self._associate(self.tracks, high, boxes, keypoints)
+            remaining = [self.tracks[i] for i in unmatched]
+            low_pairs, still_unmatched, _ = self._associate(remaining, low, boxes, keypoints)
+
+            for track_index, det in pairs:
+                self._refresh(self.tracks[track_index], boxes[det], keypoints[det], scores[det], det)
+            for track_index, det in low_pairs:
+                self._refresh(remaining[track_index], boxes[det], keypoints[det], scores[det], det)
+            for track_index in still_unmatched:
+                remaining[track_index].missed += 1
+                remaining[track_index].det_index = -1
+
+            # Only confident detections start new identities
+            for det in unmatched_high:
+                self.tracks.append(Track(self.next_id, boxes[det], keypoints[det], scores[det], det))
+                self.next_id += 1
+
+            self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+            self._check_lock()
+            return list(self.tracks)
+
+    def _check_lock(self):
+        """Release a lock whose track was dropped, after lock_grace passes; called with the lock held"""
+        if self.locked_id is not None and not any(t.track_id == self.locked_id for t in self.tracks):
+            # IDs are never reused, so the locked subject cannot come back under this ID
+            self.lock_lost_id = self.locked_id
+            self.locked_id = None
+            self.selected_id = None
+            self._lock_lost_passes = 0
+        elif self.lock_lost_id is not None:
+            self._lock_lost_passes += 1
+            if self._lock_lost_passes >= self.lock_grace:
+                self.lock_lost_id = None
+
+    def _refresh(self, track, box, keypoints, score, det_index):
+        track.det_index = det_index
+        track.box = box
+        track.keypoints = keypoints
+        track.score = score
+        track.hits += 1
+        track.missed = 0
+
+    def target(self):
+        """
+        Track to follow on this pass, or None if it was not seen
+
+        A locked ID always wins. Otherwise the first subject picked (the
+        largest person) stays selected until its track is lost. For
+        lock_grace passes after a locked track is dropped nobody is followed.
+        """
+        with self._lock:
+            if self.lock_lost_id is not None:
+                return None
+            by_id = {t.track_id: t for t in self.tracks}
+            wanted = self.locked_id if self.locked_id is not None else self.selected_id
+            track = by_id.get(wanted)
+            if track is None and self.locked_id is None and self.tracks:
+                track = max(self.tracks, key=lambda t: (t.box[2] - t.box[0]) * (t.box[3] - t.box[1]))
+                self.selected_id = track.track_id
+            if track is None or track.missed > 0:
+                return None
+            return track
+
+    def lock_target(self, track_id):
+        """Follow only track_id; returns False if no such track exists"""
+        with self._lock:
+            if not any(t.track_id == track_id for t in self.tracks):
+                return False
+            self.locked_id = track_id
+            self.selected_id = track_id
+            self.lock_lost_id = None
+            return True
+
+    def unlock(self):
+        with self._lock:
+            self.locked_id = None
+            self.lock_lost_id = None
+
+    def reset(self):
+        with self._lock:
+            self.tracks = []
+            self.selected_id = None
+            self.locked_id = None
+            self.lock_lost_id = None
+
+    def get_state(self):
+        with self._lock:
+            return {
+                'tracks': [t.to_dict() for t in self.tracks],
+                'locked_id': self.locked_id,
+                'selected_id': self.selected_id,
+                'lock_state': self._lock_state(),
+                'lock_lost_id': self.lock_lost_id,
+            }
+
+    def _lock_state(self):
+        if self.locked_id is not None:
+            return 'locked'
+        if self.lock_lost_id is not None:
+            return 'lock_lost'
+        return 'auto'
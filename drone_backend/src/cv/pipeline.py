@@ -0,0 +1,230 @@
+"""
+Staged capture -> inference -> control -> render pipeline for HeadDetector.
+
+Each stage runs in its own thread and stages are connected by small
+latest-wins queues, so a slow stream client or a slow model pass only drops
+frames for the stage that is behind instead of stalling velocity updates.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class LatestQueue:
+    """Bounded queue that keeps the newest items and drops the oldest ones"""
+
+    def __init__(self, name, maxsize=1):
+        self.name = name
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest queued item, or None on timeout / close"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'depth': len(self._items),
+                'put': self.put_count,
+                'dropped': self.dropped,
+            }
+
+
+class StageStats:
+    """Throughput and busy-time counters for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.busy_time = 0.0
+        self.last_latency_ms = 0.0
+        self.fps = 0.0
+        self._window_start = time.time()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def record(self, started):
+        now = time.time()
+        with self._lock:
+            elapsed = now - started
+            self.processed += 1
+            self.busy_time += elapsed
+            self.last_latency_ms = elapsed * 1000
+            self._window_count += 1
+            if now - self._window_start >= 1.0:
+                self.fps = self._window_count / (now - self._window_start)
+                self._window_count = 0
+                self._window_start = now
+
+    def snapshot(self):
+        with self._lock:
+            avg_ms = (self.busy_time / self.processed * 1000) if self.processed else 0.0
+            return {
+                'processed': self.processed,
+                'fps': round(self.fps, 1),
+                'avg_latency_ms': round(avg_ms, 2),
+                'last_latency_ms': round(self.last_latency_ms, 2),
+            }
+
+
+class DetectionPipeline:
+    """Runs HeadDetector as four threaded stages joined by latest-wins queues"""
+
+    STAGES = ('capture', 'inference', 'control', 'render')
+
+    def __init__(self, detector, source, frame_callback=None, control_callback=None,
+                 stop_flag=None, queue_size=1):
+        """
+        Args:
+            detector: HeadDetector providing the per-stage work
+            source: Opened FrameSource (src.cv.frame_source); read() returning None stops the pipeline
+            frame_callback: Called with (square_frame, control_values) after rendering
+            control_callback: Called with control_values as soon as velocities are updated
+            stop_flag: Optional threading.Event that stops every stage when set
+            queue_size: Capacity of each inter-stage queue
+        """
+        self.detector = detector
+        self.source = source
+        self.frame_callback = frame_callback
+        self.control_callback = control_callback
+        self.stop_flag = stop_flag
+        self._stopped = threading.Event()
+
+        self.inference_queue = LatestQueue('inference', queue_size)
+        self.control_queue = LatestQueue('control', queue_size)
+        self.render_queue = LatestQueue('render', queue_size)
+        self.stats = {name: StageStats(name) for name in self.STAGES}
+        self.threads = []
+
+    def _running(self):
+        if self.stop_flag is not None and self.stop_flag.is_set():
+            return False
+        return not self._stopped.is_set()
+
+    def stop(self):
+        self._stopped.set()
+        for q in (self.inference_queue, self.control_queue, self.render_queue):
+            q.close()
+
+    def _capture_stage(self):
+        while self._running():
+            started = time.time()
+            frame = self.source.read()
+            if frame is None:
+                print('Error: Could not read frame.')
+                break
+            for listener in self.detector.frame_listeners:
+                listener(frame)
+            self.inference_queue.put({'seq': frame.seq, 'timestamp': frame.timestamp, 'frame': frame.image})
+            self.stats['capture'].record(started)
+        self.stop()
+
+    def _inference_stage(self):
+        while self._running():
+            packet = self.inference_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+            started = time.time()
+            frame = packet['frame']
+            geometry = self.detector._square_geometry(frame)
+            detection = self.detector._update_detection(frame, geometry, packet['timestamp'])
+            packet['geometry'] = geometry
+            packet['detection'] = detection
+            self.control_queue.put(packet)
+            self.render_queue.put(packet)
+            self.stats['inference'].record(started)
+
+    def _control_stage(self):
+        while self._running():
+            packet = self.control_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+            started = time.time()
+            control_values = self.detector._apply_control(packet['detection'], packet['geometry'])
+            if self.control_callback:
+                self.control_callback(control_values)
+            self.stats['control'].record(started)
+
+    def _render_stage(self):
+        while self._running():
+            packet = self.render_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+            started = time.time()
+            frame = packet['frame']
+            geometry = packet['geometry']
+            detection = packet['detection']
+            square_frame = self.detector._render_frame(
+                frame, geometry, detection, self.stats['inference'].fps
+            )
+            if self.frame_callback:
+                self.frame_callback(square_frame, {'face_detected': detection is not None})
+            self.stats['render'].record(started)
+
+    def run(self):
+        """Start every stage and block until the pipeline stops"""
+        targets = {
+            'capture': self._capture_stage,
+            'inference': self._inference_stage,
+            'control': self._control_stage,
+            'render': self._render_stage,
+        }
+        self.threads = [
+            threading.Thread(target=self._guard(targets[name]), name=f'pipeline-{name}', daemon=True)
+            for name in self.STAGES
+        ]
+        for thread in self.threads:
+            thread.start()
+        try:
+            while self._running():
+                time.sleep(0.1)
+        finally:
+            self.stop()
+            for thread in self.threads:
+                thread.join(timeout=2)
+
+    def _guard(self, target):
+        def runner():
+            try:
+                target()
+            except Exception as e:
+                print(f'An error occurred in pipeline stage: {e}')
+                self.detector.last_error = f'{type(e).__name__}: {e}'
+                import traceback
+                traceback.print_exc()
+                self.stop()
+        return runner
+
+    def get_stats(self):
+        return {
+            'stages': {name: stats.snapshot() for name, stats in self.stats.items()},
+            'queues': {
+                q.name: q.stats()
+                for q in (self.inference_queue, self.control_queue, self.render_queue)
+            },
+        }
@@ -0,0 +1,70 @@
+"""
+Preallocated letterbox preprocessing for the pose model.
+
+Ultralytics preprocesses every numpy frame itself: letterbox into a new
+array, BGR->RGB copy, transpose, float conversion and a fresh torch tensor.
+LetterboxPreprocessor does the same work into buffers allocated once per
+input shape, and the model input is a torch view over the float buffer, so
+the hot loop allocates nothing. Results from a tensor input are in the
+imgsz x imgsz letterboxed space; `scale` and `pad` map them back.
+"""
+
+import cv2
+import numpy as np
+
+STRIDE = 32
+PAD_VALUE = 114
+
+
+def round_imgsz(imgsz):
+    """Tensor inputs must be a multiple of the model stride"""
+    return max(STRIDE, int(np.ceil(imgsz / STRIDE)) * STRIDE)
+
+
+class LetterboxPreprocessor:
+    """Resizes frames into a reused 1x3xNxN float tensor"""
+
+    def __init__(self, imgsz=640):
+        import torch
+
+        self.imgsz = round_imgsz(imgsz)
+        if self.imgsz != imgsz:
+            print(f"Rounded inference size {imgsz} up to {self.imgsz} (multiple of {STRIDE})")
+        self._canvas = np.full((self.imgsz, self.imgsz, 3), PAD_VALUE, dtype=np.uint8)
+        self._rgb = np.empty_like(self._canvas)
+        self._input = np.empty((1, 3, self.imgsz, self.imgsz), dtype=np.float32)
+        self.tensor = torch.from_numpy(self._input)  # shares memory with _input
+        self._shape = None
+        self._resized = None
+        self.scale = 1.0
+        self.pad = (0, 0)
+
+    def _layout(self, h, w):
+        """Resized region inside the canvas for an h x w input, recomputed only on shape change"""
+        self._shape = (h, w)
+        self.scale = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = int(round(w * self.scale)), int(round(h * self.scale))
+        left = (self.imgsz - new_w) // 2
+        top = (self.imgsz - new_h) // 2
+        self.pad = (left, top)
+        self._canvas[:] = PAD_VALUE
+        self._resized = self._canvas[top:top + new_h, left:left + new_w]
+
+    def __call__(self, frame):
+        """Letterbox a BGR frame into the shared input tensor and return it"""
+        h, w = frame.shape[:2]
+        if self._shape != (h, w):
+            self._layout(h, w)
+        if (h, w) == self._resized.shape[:2]:
+            np.copyto(self._resized, frame)
+        else:
+            cv2.resize(frame, (self._resized.shape[1], self._resized.shape[0]),
+                       dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self._canvas, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        np.multiply(self._rgb.transpose(2, 0, 1), np.float32(1 / 255), out=self._input[0])
+        return self.tensor
+
+    def to_source(self, offset=(0, 0)):
+        """(scale, shift) mapping model coordinates to source: src = model * scale + shift"""
+        inv = 1.0 / self.scale
+        return inv, (offset[0] - self.pad[0] * inv, offset[1] - self.pad[1] * inv)
@@ -0,0 +1,270 @@
+"""
+INT8 quantized pose model with an accuracy guardrail.
+
+The FP32 ONNX export from src.cv.inference_backends is quantized with ONNX
+Runtime: statically when recorded calibration frames are available, otherwise
+dynamically. The quantized model is then checked against FP32 on held-out
+frames and rejected if it disagrees on whether a person is present too often
+or the nose/eye keypoints drift more than the tolerance.
+
+Calibrate from the command line (from drone_backend/):
+    python -m src.cv.quantization --calibration recordings/hover.mp4 --tolerance 3
+"""
+
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+from src.cv.inference_backends import cached_model_path, load_pose_model, model_hash, resolve_weights
+
+FACE_KEYPOINTS = [0, 1, 2]  # nose, left eye, right eye
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def _image_paths(directory):
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_EXTENSIONS))
+    return [os.path.join(directory, name) for name in names]
+
+
+def calibration_hash(source, max_frames=200, length=12):
+    """Short sha256 of the calibration footage: the video file, or the images load_frames reads"""
+    if not os.path.isdir(source):
+        return f"{model_hash(source, length)}-{max_frames}"
+    digest = hashlib.sha256()
+    for path in _image_paths(source)[:max_frames]:
+        digest.update(os.path.basename(path).encode())
+        digest.update(model_hash(path).encode())
+    return digest.hexdigest()[:length]
+
+
+def load_frames(source, max_frames=200):
+    """Read BGR frames from a video file or a directory of images"""
+    frames = []
+    if os.path.isdir(source):
+        for path in _image_paths(source)[:max_frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+        return frames
+
+    cap = cv2.VideoCapture(source)
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _to_input_tensor(frame, imgsz):
+    """Letterbox a BGR frame into the 1x3xHxW float RGB tensor the exported model expects"""
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - new_h) // 2
+    left = (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = cv2.resize(frame, (new_w, new_h))
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+class FrameCalibrationReader:
+    """Feeds recorded frames to onnxruntime's static quantization calibrator"""
+
+    def __init__(self, frames, input_name, imgsz):
+        self.frames = frames
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._index = 0
+
+    def get_next(self):
+        if self._index >= len(self.frames):
+            return None
+        frame = self.frames[self._index]
+        self._index += 1
+        return {self.input_name: _to_input_tensor(frame, self.imgsz)}
+
+    def rewind(self):
+        self._index = 0
+
+
+def quantize_onnx(fp32_path, int8_path, calibration_frames=None, imgsz=640):
+    """Write an INT8 copy of fp32_path; static if calibration frames are given, else dynamic"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    if calibration_frames:
+        print(f"Static INT8 quantization with {len(calibration_frames)} calibration frames...")
+        session = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider'])
+        input_name = session.get_inputs()[0].name
+        reader = FrameCalibrationReader(calibration_frames, input_name, imgsz)
+        quantize_static(
+            fp32_path, int8_path, reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    else:
+        print("Dynamic INT8 quantization (no calibration frames)...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+def face_keypoints(results):
+    """Nose/eye keypoints of the first detected person, or None"""
+    keypoints = results[0].keypoints
+    if keypoints is None or len(keypoints) == 0:
+        return None
+    return keypoints.xy[0].cpu().numpy()[FACE_KEYPOINTS]
+
+
+def compare_face_keypoints(reference, candidate):
+    """
+    Agreement between two models' per-frame face keypoints (arrays or None)
+
+    detection_agreement is the share of frames where both models agreed on
+    whether a person was present. The pixel errors only cover frames where
+    both saw a face; they are None when there is no such frame, so a model
+    that never detects anyone cannot pass as having zero error. The head
+    size is the eye distance x2, as used by HeadDetector.
+    """
+    errors = []
+    size_errors = []
+    agreed = 0
+    for ref, cand in zip(reference, candidate):
+        if (ref is None) != (cand is None):
+            continue
+        agreed += 1
+        if ref is None:
+            continue
+        visible = (ref[:, 0] > 0) & (cand[:, 0] > 0)
+        if visible.any():
+            errors.append(float(np.linalg.norm(ref[visible] - cand[visible], axis=1).mean()))
+        if visible[1:].all():
+            ref_size = 2.0 * np.linalg.norm(ref[2] - ref[1])
+            cand_size = 2.0 * np.linalg.norm(cand[2] - cand[1])
+            size_errors.append(float(abs(ref_size - cand_size)))
+
+    return {
+        'frames': len(reference),
+        'detection_agreement': agreed / len(reference) if reference else None,
+        'mean_keypoint_error_px': float(np.mean(errors)) if errors else None,
+        'max_keypoint_error_px': float(np.max(errors)) if errors else None,
+        'mean_head_size_error_px': float(np.mean(size_errors)) if size_errors else None,
+    }
+
+
+def keypoint_error(reference_model, candidate_model, frames, imgsz=640):
+    """Run both models on the same frames and compare their nose/eye keypoints"""
+    reference, candidate = [], []
+    for frame in frames:
+        reference.append(face_keypoints(reference_model(frame, verbose=False, conf=0.3, imgsz=imgsz)))
+        candidate.append(face_keypoints(candidate_model(frame, verbose=False, conf=0.3, imgsz=imgsz)))
+    return compare_face_keypoints(reference, candidate)
+
+
+def build_int8_model(model_path, imgsz=640, calibration_source=None, tolerance_px=3.0,
+                     cache_dir=None, max_frames=200, min_agreement=0.95):
+    """
+    Quantize the pose model and validate it against FP32
+
+    Calibration frames are split in half: even frames calibrate, odd frames
+    validate. The model is accepted when it agrees with FP32 on whether a
+    person is present in at least min_agreement of the validation frames and
+    its mean nose/eye error is within tolerance_px. Without calibration
+    frames the model is dynamically quantized and cannot be validated, so it
+    is only accepted if tolerance_px is None.
+
+    Returns (int8_path or None, report). The report is cached next to the
+    model so restarts skip both quantization and validation; static models
+    are cached per calibration footage, so new footage calibrates afresh.
+    """
+    from ultralytics import YOLO
+
+    model_path = resolve_weights(model_path)
+    fp32_path = cached_model_path(model_path, 'onnx', imgsz, cache_dir)
+    if calibration_source:
+        variant = f'-int8-static-{calibration_hash(calibration_source, max_frames)}'
+    else:
+        variant = '-int8-dynamic'
+    int8_path = cached_model_path(model_path, 'onnx', imgsz, cache_dir, variant=variant)
+    report_path = f"{int8_path}.json"
+
+    if os.path.exists(int8_path) and os.path.exists(report_path):
+        with open(report_path) as f:
+            report = json.load(f)
+        if _within_tolerance(report, tolerance_px, min_agreement):
+            print(f"Using cached INT8 model: {int8_path}")
+            return int8_path, report
+        if report.get('tolerance_px') == tolerance_px and report.get('min_agreement') == min_agreement:
+            print(f"Cached INT8 model was rejected at this tolerance: {report}")
+            return None, report
+
+    # Exports and caches the FP32 ONNX model that gets quantized
+    fp32_model = load_pose_model(model_path, backend='onnx', imgsz=imgsz, cache_dir=cache_dir)
+
+    frames = load_frames(calibration_source, max_frames) if calibration_source else []
+    calibration_frames = frames[0::2]
+    validation_frames = frames[1::2]
+
+    os.makedirs(os.path.dirname(int8_path), exist_ok=True)
+    quantize_onnx(fp32_path, int8_path, calibration_frames, imgsz)
+
+    if validation_frames:
+        int8_model = YOLO(int8_path, task='pose')
+        report = keypoint_error(fp32_model, int8_model, validation_frames, imgsz)
+    else:
+        report = {'frames': 0}
+    report['tolerance_px'] = tolerance_px
+    report['min_agreement'] = min_agreement
+    report['calibration_source'] = calibration_source
+
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if not _within_tolerance(report, tolerance_px, min_agreement):
+        print(f"Rejected INT8 model: {report}")
+        return None, report
+
+    print(f"Accepted INT8 model: {report}")
+    return int8_path, report
+
+
+def _within_tolerance(report, tolerance_px, min_agreement=0.95):
+    if tolerance_px is None:
+        return True
+    if not report.get('frames'):
+        return False
+    agreement = report.get('detection_agreement')
+    error = report.get('mean_keypoint_error_px')
+    # No comparable frames means nothing was validated, not zero error
+    if agreement is None or error is None:
+        return False
+    return agreement >= min_agreement and error <= tolerance_px
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build and validate the INT8 pose model')
+    parser.add_argument('--model', default='yolov8n-pose.pt')
+    parser.add_argument('--calibration', help='Video file or image directory of recorded frames')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--tolerance', type=float, default=3.0, help='Max mean nose/eye error in pixels')
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help='Min share of frames where FP32 and INT8 agree a person is present')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--cache-dir', default=None)
+    args = parser.parse_args()
+
+    path, report = build_int8_model(args.model, imgsz=args.imgsz, calibration_source=args.calibration,
+                                    tolerance_px=args.tolerance, cache_dir=args.cache_dir,
+                                    max_frames=args.frames, min_agreement=args.min_agreement)
+    print(json.dumps(report, indent=2))
+    print(f"INT8 model: {path}" if path else "INT8 model rejected")
@@ -0,0 +1,99 @@
+"""
+Adaptive inference scheduling for HeadDetector.
+
+Replaces the fixed `skip_frames` counter with a per-frame decision based on
+how long inference actually takes and how fast the head is moving: a still
+subject is sampled slowly, a fast one as often as the CPU budget allows.
+A scheduled frame can still be skipped later (e.g. by the motion gate), so
+the pacing only counts passes reported through record_inference.
+"""
+
+from collections import deque
+
+
+class AdaptiveFrameScheduler:
+    """Decides per frame whether the pose model should run"""
+
+    def __init__(self, target_rate=10.0, min_rate=3.0, max_rate=30.0, cpu_budget=0.7,
+                 slow_speed=20.0, fast_speed=300.0, latency_alpha=0.2):
+        """
+        Args:
+            target_rate: Nominal detections per second; a still head gets half of
+                it and a fast one 1.5x, limited by the CPU budget
+            min_rate: Lower bound on detections per second
+            max_rate: Upper bound on detections per second
+            cpu_budget: Fraction of wall time inference may occupy
+            slow_speed: Head speed (px/s) treated as still
+            fast_speed: Head speed (px/s) treated as fast
+            latency_alpha: Smoothing factor for the rolling inference latency
+        """
+        self.target_rate = target_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.cpu_budget = cpu_budget
+        self.slow_speed = slow_speed
+        self.fast_speed = fast_speed
+        self.latency_alpha = latency_alpha
+
+        self.latency = None
+        self.last_inference_time = None
+        self.current_rate = target_rate
+        self.head_speed = 0.0
+        # scheduled/skip are should_infer answers; infer counts passes that actually ran
+        self.decisions = {'scheduled': 0, 'skip': 0, 'infer': 0}
+        self._inference_times = deque(maxlen=120)
+
+    def _desired_rate(self, head_speed):
+        # Scale the target rate from 0.5x for a still head to 1.5x for a fast one
+        motion = (head_speed - self.slow_speed) / (self.fast_speed - self.slow_speed)
+        rate = self.target_rate * (0.5 + min(max(motion, 0.0), 1.0))
+        if self.latency:
+            rate = min(rate, self.cpu_budget / self.latency)
+        return min(max(rate, self.min_rate), self.max_rate)
+
+    def should_infer(self, timestamp, head_speed, has_track):
+        """
+        Args:
+            timestamp: Capture time of the current frame (s)
+            head_speed: Estimated head speed in px/s
+            has_track: False while searching, which always runs inference
+        """
+        self.head_speed = head_speed
+        self.current_rate = self._desired_rate(head_speed)
+
+        infer = (
+            not has_track
+            or self.last_inference_time is None
+            or timestamp - self.last_inference_time >= 1.0 / self.current_rate
+        )
+        self.decisions['scheduled' if infer else 'skip'] += 1
+        return infer
+
+    def record_inference(self, timestamp):
+        """Note a pose-model pass on the frame captured at timestamp"""
+        self.decisions['infer'] += 1
+        self.last_inference_time = timestamp
+        self._inference_times.append(timestamp)
+
+    def record_latency(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency = self.latency_alpha * seconds + (1 - self.latency_alpha) * self.latency
+
+    def achieved_rate(self):
+        """Inferences per second over the recent window"""
+        times = self._inference_times
+        if len(times) < 2:
+            return 0.0
+        span = times[-1] - times[0]
+        return (len(times) - 1) / span if span > 0 else 0.0
+
+    def get_stats(self):
+        return {
+            'target_rate': round(self.current_rate, 2),
+            'achieved_rate': round(self.achieved_rate(), 2),
+            'latency_ms': round(self.latency * 1000, 2) if self.latency else None,
+            'head_speed_px_s': round(self.head_speed, 1),
+            'decisions': dict(self.decisions),
+        }
@@ -1,12 +1,23 @@
-from google import genai
 import json
 import os
+import threading
 from .systems_prompt import SYSTEM_PROMPT
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = genai.Client(api_key=os.getenv('GEMINI_KEY'))
+# google.genai is slow to import; the client is created on first use
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Shared Gemini client, created on first call"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google import genai
+            _client = genai.Client(api_key=os.getenv('GEMINI_KEY'))
+        return _client
 
 def get_agent_response(user_req):
     """
@@ -19,9 +30,11 @@ def get_agent_response(user_req):
         dict: JSON response containing the agent's response and actions
     """
     try:
+        from google import genai
+
         full_prompt = f"{SYSTEM_PROMPT}\n\nUser Request: {user_req}"
         
-        response = client.models.generate_content(
+        response = get_client().models.generate_content(
             model='gemini-2.0-flash-exp',
             contents=full_prompt,
             config=genai.types.GenerateContentConfig(
@@ -1,11 +1,22 @@
-from openai import OpenAI
 import os
 import tempfile
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv('OPENAI_KEY'))
+# openai is slow to import; the client is created on first use
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Shared OpenAI client, created on first call"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=os.getenv('OPENAI_KEY'))
+        return _client
 
 def transcribe_audio(audio_file):
 
@@ -27,7 +38,7 @@ def transcribe_audio(audio_file):
             return None
         
         with open(temp_path, 'rb') as audio:
-            response = client.audio.transcriptions.create(
+            response = get_client().audio.transcriptions.create(
                 model="whisper-1",
                 file=audio,
                 response_format="verbose_json",
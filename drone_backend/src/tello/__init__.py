@@ -1,3 +1,3 @@
 from src.tello.controller import TelloController
-from src.tello.flight_logic import FlightLogic, get_drone, get_head_detector
+from src.tello.flight_logic import FlightLogic, get_drone, get_head_detector, get_object_detector
 from src.tello.controller import Tello
\ No newline at end of file
@@ -1,32 +1,81 @@
 from src.tello import TelloController
-from src.cv import HeadDetector
+from src.cv import HeadDetector, ObjectDetector
 from src import utils
 import time
 from src.utils.llm_helper import initialize_tuner
+from src.utils.readiness import set_status
 import logging
 import threading
+import os
 
 logger = logging.getLogger(__name__)
 drone = None
 head_detector = None
+object_detector = None
 _init_lock = threading.Lock()
 _initialized = False
 
 def ensure_initialized():
-    global drone, head_detector, _initialized
+    global drone, head_detector, object_detector, _initialized
     
     print(f"DEBUG ensure_initialized: Called, _initialized={_initialized}")
     
     with _init_lock:
         if not _initialized:
             print("Initializing drone and detector...")
-            drone = TelloController()
-            head_detector = HeadDetector(drone=drone)
+            set_status('drone', 'loading')
+            try:
+                drone = TelloController()
+            except Exception as e:
+                set_status('drone', 'failed', error=str(e))
+                raise
+            set_status('drone', 'ready')
+
+            set_status('detector', 'loading')
+            started = time.perf_counter()
+            try:
+                head_detector = _create_head_detector(drone)
+            except Exception as e:
+                set_status('detector', 'failed', error=str(e))
+                raise
+            set_status('detector', 'ready', load_seconds=round(time.perf_counter() - started, 3))
+
+            # Dummy passes so the first tracked frames do not pay for lazy model setup
+            warmup_iterations = int(os.getenv('WARMUP_ITERATIONS', '2'))
+            if warmup_iterations > 0:
+                set_status('warmup', 'loading')
+                try:
+                    set_status('warmup', 'ready', **head_detector.warmup(warmup_iterations))
+                except Exception as e:
+                    print(f"Model warm-up failed: {e}")
+                    set_status('warmup', 'failed', error=str(e))
+            else:
+                set_status('warmup', 'ready', skipped=True)
+
+            # Probe the JPEG backends now rather than when the first viewer connects
+            set_status('stream_encoder', 'loading')
+            try:
+                encoder = utils.select_stream_encoder()
+                set_status('stream_encoder', 'ready', encoder=encoder.name, subsampling=encoder.subsampling)
+            except Exception as e:
+                print(f"JPEG encoder selection failed: {e}")
+                set_status('stream_encoder', 'failed', error=str(e))
+
+            # Optional general object detection on the head tracker's frames
+            if os.getenv('OBJECT_DETECTION', '0') == '1':
+                try:
+                    object_detector = _create_object_detector()
+                    object_detector.attach(head_detector)
+                except Exception as e:
+                    print(f"Object detection disabled: {e}")
+                    object_detector = None
             
             print("🔧 Initializing LLM tuner...")
+            set_status('llm_tuner', 'loading')
             print(f"DEBUG: head_detector object: {head_detector}")
             print(f"DEBUG: Created head_detector id: {id(head_detector)}")
             initialize_tuner(head_detector)
+            set_status('llm_tuner', 'ready')
             print("✅ LLM tuner initialization complete")
             
             _initialized = True
@@ -34,6 +83,36 @@ def ensure_initialized():
     print(f"DEBUG ensure_initialized: Returning, _initialized={_initialized}")
     return drone, head_detector
 
+def _create_head_detector(drone):
+    """HeadDetector configured from the environment"""
+    return HeadDetector(
+        drone=drone,
+        pipeline_mode=os.getenv('HEAD_PIPELINE_MODE', '0') == '1',
+        backend=os.getenv('INFERENCE_BACKEND', 'pytorch'),
+        imgsz=int(os.getenv('INFERENCE_IMGSZ', '640')),
+        int8=os.getenv('INFERENCE_INT8', '0') == '1',
+        calibration_source=os.getenv('INT8_CALIBRATION_SOURCE'),
+        roi_mode=os.getenv('INFERENCE_ROI_MODE', '0') == '1',
+        adaptive_skip=os.getenv('ADAPTIVE_FRAME_SKIP', '0') == '1',
+        client_side_annotations=os.getenv('CLIENT_SIDE_OVERLAY', '0') == '1',
+        motion_gate=os.getenv('MOTION_GATE', '0') == '1',
+        tensor_input=os.getenv('INFERENCE_TENSOR_INPUT', '0') == '1',
+        square_input=os.getenv('INFERENCE_SQUARE_INPUT', '0') == '1',
+        frame_source=os.getenv('FRAME_SOURCE'),
+        optical_flow=os.getenv('OPTICAL_FLOW', '0') == '1'
+    )
+
+def _create_object_detector():
+    """ObjectDetector configured from the environment"""
+    classes = os.getenv('OBJECT_CLASSES')
+    return ObjectDetector(
+        model_path=os.getenv('OBJECT_MODEL', 'yolo11n.pt'),
+        classes=classes.split(',') if classes else None,
+        conf_threshold=float(os.getenv('OBJECT_CONF', '0.5')),
+        imgsz=int(os.getenv('OBJECT_IMGSZ', '640')),
+        device=os.getenv('OBJECT_DEVICE', 'cpu')
+    )
+
 def get_drone():
     ensure_initialized()
     return drone
@@ -42,6 +121,11 @@ def get_head_detector():
     ensure_initialized()
     return head_detector
 
+def get_object_detector():
+    """The ObjectDetector sharing the head tracker's frames, or None if disabled"""
+    ensure_initialized()
+    return object_detector
+
 class FlightLogic:
     def __init__(self):
         ensure_initialized()
@@ -1,3 +1,4 @@
-from .cam_helper import run_detection, generate_frames, update_frame, current_drone_data, frame_lock, stop_flag, head_model
+from .cam_helper import run_detection, generate_frames, update_frame, current_drone_data, drone_data_lock, stop_flag, head_model, get_tracking_stats, get_objects, get_targets, lock_target, unlock_target, generate_detections, generate_h264_segments, select_stream_encoder
 from .tello_helper import run_logic, stop_logic
+from .readiness import get_readiness
 from .llm_helper import current_llm_data, initialize_tuner, process_audio_request, process_text_request, reset_parameters, get_current_thresholds, LLMParameterTuner, tuner_lock
\ No newline at end of file
@@ -1,12 +1,28 @@
-from src.tello import get_head_detector
+from src.tello import get_head_detector, get_object_detector
+from src.utils.stream_hub import MjpegBroadcaster
+from src.utils.h264_stream import H264Broadcaster, h264_available
+from src.utils.jpeg_encoder import select_jpeg_encoder
 import threading
-import cv2
+import json
+import os
 
-latest_frame = None
 head_model = None
-frame_lock = threading.Lock()
+object_model = None
+drone_data_lock = threading.Lock()
 stop_flag = threading.Event() 
 
+# Copies each rendered frame into a preallocated ring and encodes it once for every
+# /api/video-tracking client; it has its own locking, separate from drone_data_lock
+broadcaster = MjpegBroadcaster(quality=85, workers=int(os.getenv('JPEG_WORKERS', '2')))
+jpeg_encoder_selected = False
+# Optional H.264/fMP4 stream over WebSocket; only encodes while someone is connected
+h264_broadcaster = H264Broadcaster(fps=30)
+
+# Detection metadata channel for clients that draw annotations themselves
+latest_detection = None
+detection_seq = 0
+detection_cond = threading.Condition()
+
 current_drone_data = {
     'forward': False,
     'backward': False,
@@ -19,16 +35,17 @@ current_drone_data = {
 
 def run_detection():
     """Run head detection in background thread"""
-    global latest_frame, frame_lock, current_drone_data, stop_flag, head_model
+    global drone_data_lock, current_drone_data, stop_flag, head_model, object_model
     head_model = get_head_detector()
+    object_model = get_object_detector()
     print(f"DEBUG cam_helper: Using head_detector id: {id(head_model)}")
     print(f"DEBUG: Initial velocities - fb:{head_model.fb_velocity}, ud:{head_model.ud_velocity}, yaw:{head_model.yaw_velocity}")
-    def combined_callback(frame, control_values):
+    head_model.overlay.is_watched = has_stream_subscribers
+
+    def control_callback(control_values):
         if stop_flag.is_set():
             return
-        update_frame (frame)
-
-        with frame_lock:
+        with drone_data_lock:
             current_drone_data.update({
                 'forward': head_model.forward,
                 'backward': head_model.backward,
@@ -39,39 +56,104 @@ def run_detection():
                 'center': head_model.center,
                 'face_detected': control_values['face_detected']    
             })
+        metadata = control_values['detection']
+        if object_model is not None:
+            metadata = dict(metadata, objects=object_model.latest())
+        publish_detection(metadata)
+
+    def frame_callback(frame, control_values):
+        if stop_flag.is_set():
+            return
+        update_frame (frame)
             
-    head_model.run_head_detection(frame_callback=combined_callback, stop_flag=stop_flag)
+    # The server has no display; frames go out through the stream instead of an OpenCV window
+    head_model.run_head_detection(frame_callback=frame_callback, control_callback=control_callback,
+                                  stop_flag=stop_flag, headless=True)
 
 #def run_flight_logic():
 #    global 
 
-def generate_frames():
-    """Generator function that yields video frames"""
-    global latest_frame, frame_lock
-    
-    while True:
-        if stop_flag and stop_flag.is_set():
-            break
-        with frame_lock:
-            if latest_frame is None:
-                print("Waiting for first frame...")
-                import time
-                time.sleep(0.1)
+def select_stream_encoder():
+    """Pick the JPEG backend once, during startup; returns the encoder in use"""
+    global jpeg_encoder_selected
+    if not jpeg_encoder_selected:
+        jpeg_encoder_selected = True
+        broadcaster.set_encoder(select_jpeg_encoder(
+            os.getenv('JPEG_ENCODER', 'auto'),
+            subsampling=os.getenv('JPEG_SUBSAMPLING', '420'),
+            quality=broadcaster.quality,
+        ))
+    return broadcaster.encoder
+
+def has_stream_subscribers():
+    return broadcaster.has_subscribers() or h264_broadcaster.has_subscribers()
+
+def generate_frames(fps=None, max_size=None, quality=None, auto=False):
+    """Generator function that yields video frames at the client's rate, size and quality"""
+    return broadcaster.stream(stop_flag, fps=fps, max_size=max_size, quality=quality, auto=auto)
+
+def generate_h264_segments():
+    """Generator of fMP4 init segment and fragments, or None if PyAV is not installed"""
+    if not h264_available():
+        return None
+    return h264_broadcaster.stream(stop_flag)
+
+def publish_detection(metadata):
+    """Share the latest detection with /api/detections subscribers"""
+    global latest_detection, detection_seq
+    with detection_cond:
+        latest_detection = metadata
+        detection_seq += 1
+        detection_cond.notify_all()
+
+def generate_detections():
+    """Server-sent events stream of detection metadata, one event per control update"""
+    last_seq = -1
+    while not stop_flag.is_set():
+        with detection_cond:
+            if detection_seq == last_seq:
+                detection_cond.wait(timeout=1.0)
+            if detection_seq == last_seq:
                 continue
-            frame = latest_frame.copy()
-        
-        # Encode frame as JPEG
-        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        if not ret:
-            continue
-            
-        frame_bytes = buffer.tobytes()
-        
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            last_seq = detection_seq
+            payload = json.dumps(latest_detection)
+        yield f"data: {payload}\n\n"
 
 def update_frame(frame):
-    """Update the shared frame for streaming"""
-    global latest_frame, frame_lock
-    with frame_lock:
-        latest_frame = frame
\ No newline at end of file
+    """Copy frame into the stream ring; the detection loop may reuse frame afterwards"""
+    broadcaster.publish(frame)
+    h264_broadcaster.publish(frame)
+
+def get_tracking_stats():
+    """Telemetry from the running head detector"""
+    if head_model is None:
+        return None
+    telemetry = head_model.get_telemetry()
+    telemetry['object_detection'] = object_model.get_stats() if object_model is not None else None
+    telemetry['stream'] = broadcaster.get_stats()
+    telemetry['h264_stream'] = h264_broadcaster.get_stats()
+    return telemetry
+
+def get_objects():
+    """Latest general object detections, or None if object detection is off"""
+    if object_model is None:
+        return None
+    return object_model.latest()
+
+def get_targets():
+    """Tracked people and the currently followed/locked IDs"""
+    if head_model is None:
+        return None
+    return head_model.person_tracker.get_state()
+
+def lock_target(track_id):
+    """Lock tracking onto one person ID"""
+    if head_model is None:
+        return False
+    return head_model.person_tracker.lock_target(track_id)
+
+def unlock_target():
+    if head_model is None:
+        return False
+    head_model.person_tracker.unlock()
+    return True
\ No newline at end of file
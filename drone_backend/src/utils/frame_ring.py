@@ -0,0 +1,90 @@
+"""
+Preallocated frame ring between the detection loop and stream consumers.
+
+One writer copies each rendered frame into the next of a few fixed slots
+and stamps the slot with the frame's sequence number. Readers get a
+read-only view of a slot, never a copy, and check the stamp again after
+they are done: if the writer lapped them and reused the slot mid-read the
+result is thrown away. Slots are only reallocated when the frame size
+changes, so steady-state handoff allocates nothing.
+"""
+
+import threading
+
+import numpy as np
+
+# Slot stamp while the writer is copying into it
+WRITING = -1
+
+
+class FrameRing:
+    """Fixed slots of frame memory with single-writer, multi-reader handoff"""
+
+    def __init__(self, slots=4):
+        """
+        Args:
+            slots: Frames kept; a reader slower than slots - 1 frames has to retry
+        """
+        self.slots = slots
+        self._buffers = None
+        self._views = None
+        self._stamps = [0] * slots
+        self._seq = 0
+        self._resize_lock = threading.Lock()
+        self.stats = {'written': 0, 'reallocations': 0, 'torn_reads': 0}
+
+    def _allocate(self, shape, dtype):
+        buffers = [np.empty(shape, dtype=dtype) for _ in range(self.slots)]
+        views = []
+        for buffer in buffers:
+            view = buffer.view()
+            view.flags.writeable = False
+            views.append(view)
+        with self._resize_lock:
+            # Old arrays stay alive for readers still holding their views
+            self._buffers, self._views = buffers, views
+            self._stamps = [0] * self.slots
+        self.stats['reallocations'] += 1
+
+    def write(self, frame):
+        """Copy frame into the next slot and return its sequence number (writer thread only)"""
+        if self._buffers is None or self._buffers[0].shape != frame.shape or self._buffers[0].dtype != frame.dtype:
+            self._allocate(frame.shape, frame.dtype)
+        seq = self._seq + 1
+        slot = seq % self.slots
+        self._stamps[slot] = WRITING
+        np.copyto(self._buffers[slot], frame)
+        self._stamps[slot] = seq
+        self._seq = seq
+        self.stats['written'] += 1
+        return seq
+
+    @property
+    def latest_seq(self):
+        return self._seq
+
+    def read(self, seq=None):
+        """(seq, read-only view) for frame seq (latest by default), or None if it was overwritten"""
+        if seq is None:
+            seq = self._seq
+        if seq <= 0:
+            return None
+        with self._resize_lock:
+            stamps, views = self._stamps, self._views
+        slot = seq % self.slots
+        if stamps[slot] != seq:
+            return None
+        return seq, views[slot]
+
+    def is_intact(self, seq):
+        """True if the slot read for seq has not been rewritten since; check after using the view"""
+        intact = self._stamps[seq % self.slots] == seq
+        if not intact:
+            self.stats['torn_reads'] += 1
+        return intact
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['slots'] = self.slots
+        stats['latest_seq'] = self._seq
+        return stats
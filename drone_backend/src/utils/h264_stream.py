@@ -0,0 +1,280 @@
+"""
+H.264 in fragmented MP4 for the tracking stream, as an alternative to MJPEG.
+
+Frames are encoded once with libx264 (ultrafast, zerolatency) through PyAV
+and muxed as fMP4 with one fragment per frame, which browsers can play with
+Media Source Extensions. Every subscriber gets the init segment (ftyp+moov)
+followed by fragments starting at a keyframe; a new subscriber forces the
+next frame to be a keyframe so it does not wait for the GOP to come around.
+
+The encoder runs on its own thread and takes frames the way ObjectDetector
+does: a frame is copied into a reused buffer only when the encoder is free,
+otherwise it is skipped. A subscriber that falls too far behind has its
+queue cleared and resumes at the next keyframe.
+
+PyAV is optional (pip install av); h264_available() reports whether it is.
+"""
+
+import collections
+import threading
+import time
+from fractions import Fraction
+
+import numpy as np
+
+TIME_BASE = Fraction(1, 1000)
+
+
+def h264_available():
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _BoxSink:
+    """File-like target for the muxer that hands back complete top-level MP4 boxes"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        return len(data)
+
+    def boxes(self):
+        """(type, bytes) for every complete box written so far"""
+        boxes = []
+        while len(self._buffer) >= 8:
+            size = int.from_bytes(self._buffer[:4], 'big')
+            header = 8
+            if size == 1 and len(self._buffer) >= 16:
+                size = int.from_bytes(self._buffer[8:16], 'big')
+                header = 16
+            if size < header or len(self._buffer) < size:
+                break
+            boxes.append((bytes(self._buffer[4:8]), bytes(self._buffer[:size])))
+            del self._buffer[:size]
+        return boxes
+
+
+class _Encoder:
+    """One libx264 encode session muxed to fMP4; reopened when the frame size changes"""
+
+    def __init__(self, width, height, fps, crf, gop):
+        import av
+
+        self.av = av
+        self.width = width
+        self.height = height
+        self.sink = _BoxSink()
+        self.container = av.open(self.sink, mode='w', format='mp4',
+                                 options={'movflags': 'empty_moov+default_base_moof+frag_every_frame'})
+        self.stream = self.container.add_stream('libx264', rate=Fraction(fps).limit_denominator(1001))
+        self.stream.width = width
+        self.stream.height = height
+        self.stream.pix_fmt = 'yuv420p'
+        self.stream.codec_context.time_base = TIME_BASE
+        self.stream.codec_context.gop_size = gop
+        self.stream.options = {'preset': 'ultrafast', 'tune': 'zerolatency', 'crf': str(crf), 'forced-idr': '1'}
+
+        self.init_segment = b''
+        self._moof = None
+        self._keyframes = collections.deque()
+        self._start = None
+        self._last_pts = -1
+
+    def encode(self, image, timestamp, keyframe=False):
+        """List of (fragment_bytes, is_keyframe) produced by one BGR frame"""
+        if self._start is None:
+            self._start = timestamp
+        frame = self.av.VideoFrame.from_ndarray(image, format='bgr24')
+        pts = max(int((timestamp - self._start) * 1000), self._last_pts + 1)
+        self._last_pts = pts
+        frame.pts = pts
+        frame.time_base = TIME_BASE
+        if keyframe:
+            frame.pict_type = self.av.video.frame.PictureType.I
+
+        for packet in self.stream.encode(frame):
+            self._keyframes.append(packet.is_keyframe)
+            self.container.mux(packet)
+
+        fragments = []
+        for box_type, data in self.sink.boxes():
+            if box_type in (b'ftyp', b'moov'):
+                self.init_segment += data
+            elif box_type == b'moof':
+                self._moof = data
+            elif box_type == b'mdat' and self._moof is not None:
+                # zerolatency has no frame delay, so fragments come out in packet order
+                is_keyframe = self._keyframes.popleft() if self._keyframes else False
+                fragments.append((self._moof + data, is_keyframe))
+                self._moof = None
+        return fragments
+
+    def close(self):
+        try:
+            self.container.close()
+        except Exception as e:
+            print(f'Error closing H.264 encoder: {e}')
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue = collections.deque()
+        self.waiting_keyframe = True
+
+
+class H264Broadcaster:
+    """Encodes published frames once to fMP4 and fans the fragments out to subscribers"""
+
+    def __init__(self, fps=30, crf=23, gop=None, max_queue=30):
+        """
+        Args:
+            fps: Nominal frame rate given to the encoder; timestamps follow the real frames
+            crf: x264 constant rate factor; higher is smaller and blurrier
+            gop: Frames between forced keyframes; defaults to one second
+            max_queue: Fragments a subscriber may fall behind before skipping to a keyframe
+        """
+        self.fps = fps
+        self.crf = crf
+        self.gop = gop or int(fps)
+        self.max_queue = max_queue
+
+        self._cond = threading.Condition()
+        self._buffer = None
+        self._pending = None
+        self._busy = False
+        self._force_keyframe = False
+        self._encoder = None
+        self._subscribers = []
+        self.thread = None
+        self._first_output = None
+        self.stats = {'submitted': 0, 'skipped_busy': 0, 'encoded': 0, 'keyframes': 0, 'bytes': 0,
+                      'dropped_fragments': 0, 'encode_errors': 0, 'avg_encode_ms': 0.0}
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def publish(self, frame):
+        """Hand a frame to the encoder; skipped while nobody watches or the encoder is busy"""
+        if not self._subscribers:
+            return
+        with self._cond:
+            self.stats['submitted'] += 1
+            if self._busy:
+                self.stats['skipped_busy'] += 1
+                return
+            # yuv420p needs even dimensions
+            h, w = frame.shape[0] & ~1, frame.shape[1] & ~1
+            if self._buffer is None or self._buffer.shape[:2] != (h, w):
+                self._buffer = np.empty((h, w, 3), dtype=np.uint8)
+            np.copyto(self._buffer, frame[:h, :w])
+            self._pending = time.monotonic()
+            self._busy = True
+            self._cond.notify_all()
+
+    def _start_worker(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._worker, name='h264-encoder', daemon=True)
+            self.thread.start()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                if self._pending is None:
+                    if not self._subscribers:
+                        self._close_encoder()
+                        self.thread = None
+                        return
+                    self._cond.wait(timeout=0.5)
+                timestamp, self._pending = self._pending, None
+                if timestamp is None:
+                    continue
+                keyframe, self._force_keyframe = self._force_keyframe, False
+
+            image = self._buffer
+            started = time.perf_counter()
+            try:
+                if self._encoder is None or (self._encoder.height, self._encoder.width) != image.shape[:2]:
+                    self._close_encoder()
+                    self._encoder = _Encoder(image.shape[1], image.shape[0], self.fps, self.crf, self.gop)
+                    keyframe = True
+                fragments = self._encoder.encode(image, timestamp, keyframe)
+            except Exception as e:
+                print(f'H.264 encode failed: {e}')
+                self.stats['encode_errors'] += 1
+                self._close_encoder()
+                fragments = []
+            encode_ms = (time.perf_counter() - started) * 1000
+
+            with self._cond:
+                self._busy = False
+                self.stats['encoded'] += 1
+                self.stats['avg_encode_ms'] += (encode_ms - self.stats['avg_encode_ms']) * 0.1
+                if fragments:
+                    self._distribute(fragments)
+                self._cond.notify_all()
+
+    def _distribute(self, fragments):
+        """Queue fragments for every subscriber; called with the condition held"""
+        init_segment = self._encoder.init_segment
+        if self._first_output is None:
+            self._first_output = time.monotonic()
+        for data, is_keyframe in fragments:
+            self.stats['bytes'] += len(data)
+            self.stats['keyframes'] += is_keyframe
+            for subscriber in self._subscribers:
+                if subscriber.waiting_keyframe and not is_keyframe:
+                    continue
+                if len(subscriber.queue) >= self.max_queue:
+                    self.stats['dropped_fragments'] += len(subscriber.queue)
+                    subscriber.queue.clear()
+                    subscriber.waiting_keyframe = True
+                    if not is_keyframe:
+                        continue
+                subscriber.waiting_keyframe = False
+                subscriber.queue.append((init_segment, data))
+
+    def _close_encoder(self):
+        if self._encoder is not None:
+            self._encoder.close()
+            self._encoder = None
+
+    def stream(self, stop_flag=None, timeout=1.0):
+        """Generator of fMP4 bytes for one client: the init segment, then fragments"""
+        subscriber = _Subscriber()
+        with self._cond:
+            self._subscribers.append(subscriber)
+            self._force_keyframe = True
+            self._start_worker()
+        sent_init = None
+        try:
+            while not (stop_flag is not None and stop_flag.is_set()):
+                with self._cond:
+                    if not subscriber.queue:
+                        self._cond.wait(timeout)
+                    if not subscriber.queue:
+                        continue
+                    init_segment, data = subscriber.queue.popleft()
+                # A reopened encoder (new frame size) comes with a new init segment
+                if init_segment is not sent_init:
+                    sent_init = init_segment
+                    yield init_segment
+                yield data
+        finally:
+            with self._cond:
+                self._subscribers.remove(subscriber)
+                self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats['subscribers'] = len(self._subscribers)
+            first_output = self._first_output
+        stats['avg_encode_ms'] = round(stats['avg_encode_ms'], 2)
+        elapsed = time.monotonic() - first_output if first_output is not None else 0
+        stats['kbps'] = round(stats['bytes'] * 8 / elapsed / 1000, 1) if elapsed > 0 else None
+        return stats
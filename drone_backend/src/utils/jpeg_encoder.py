@@ -0,0 +1,122 @@
+"""
+JPEG encoder backends for the MJPEG stream.
+
+OpenCVJpegEncoder always works. TurboJpegEncoder uses libjpeg-turbo through
+PyTurboJPEG (pip install PyTurboJPEG, plus the libturbojpeg shared library)
+with its SIMD code and fast DCT. Both take a chroma subsampling mode.
+select_jpeg_encoder times every available backend on a sample frame and
+returns the fastest, unless a backend is named explicitly.
+"""
+
+import time
+
+import numpy as np
+
+SUBSAMPLING = ('444', '422', '420')
+
+
+class OpenCVJpegEncoder:
+    name = 'opencv'
+
+    def __init__(self, subsampling='420'):
+        import cv2
+
+        self.cv2 = cv2
+        self.subsampling = subsampling
+        self._params = []
+        # Older OpenCV builds always encode 4:2:0
+        factor = getattr(cv2, f'IMWRITE_JPEG_SAMPLING_FACTOR_{subsampling}', None)
+        if factor is not None:
+            self._params = [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, factor]
+
+    def encode(self, image, quality):
+        """JPEG bytes for a BGR image, or None on failure"""
+        ret, buffer = self.cv2.imencode('.jpg', image, [self.cv2.IMWRITE_JPEG_QUALITY, quality] + self._params)
+        return buffer.tobytes() if ret else None
+
+
+class TurboJpegEncoder:
+    name = 'turbojpeg'
+
+    def __init__(self, subsampling='420', fast_dct=True):
+        """Raises ImportError or RuntimeError if PyTurboJPEG or libturbojpeg is missing"""
+        import turbojpeg
+
+        self.jpeg = turbojpeg.TurboJPEG()
+        self.subsampling = subsampling
+        self._subsample = getattr(turbojpeg, f'TJSAMP_{subsampling}')
+        self._flags = turbojpeg.TJFLAG_FASTDCT if fast_dct else 0
+
+    def encode(self, image, quality):
+        """JPEG bytes for a BGR image, or None on failure"""
+        try:
+            return self.jpeg.encode(image, quality=quality, jpeg_subsample=self._subsample, flags=self._flags)
+        except OSError as e:
+            print(f'TurboJPEG encode failed: {e}')
+            return None
+
+
+BACKENDS = {'opencv': OpenCVJpegEncoder, 'turbojpeg': TurboJpegEncoder}
+
+
+def available_encoders(subsampling='420'):
+    """Instances of every backend that loads on this machine"""
+    encoders = []
+    for name, backend in BACKENDS.items():
+        try:
+            encoders.append(backend(subsampling=subsampling))
+        except (ImportError, RuntimeError, OSError) as e:
+            print(f"JPEG backend '{name}' unavailable: {e}")
+    return encoders
+
+
+def _sample_frame(size):
+    """Gradient with noise: smooth areas plus detail, roughly like a camera frame"""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 200, size, dtype=np.float32)
+    frame = gradient[None, :, None] + gradient[:, None, None] * 0.2 + rng.normal(0, 12, (size, size, 3))
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def benchmark_encoder(encoder, frame, quality=85, iterations=10):
+    """Median encode time in ms"""
+    encoder.encode(frame, quality)  # first call sets up library state
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        encoder.encode(frame, quality)
+        samples.append((time.perf_counter() - started) * 1000)
+    return float(np.median(samples))
+
+
+def select_jpeg_encoder(preference='auto', subsampling='420', quality=85, sample_size=720):
+    """
+    Encoder to use for the stream
+
+    Args:
+        preference: 'auto' to benchmark every available backend, or a name in BACKENDS
+        subsampling: Chroma subsampling, one of SUBSAMPLING
+        quality: JPEG quality used for the benchmark
+        sample_size: Side of the square sample frame, matching the streamed frame
+    """
+    if subsampling not in SUBSAMPLING:
+        print(f"Unknown JPEG subsampling '{subsampling}', using 420")
+        subsampling = '420'
+
+    if preference != 'auto':
+        if preference not in BACKENDS:
+            print(f"Unknown JPEG encoder '{preference}', picking automatically")
+        else:
+            try:
+                return BACKENDS[preference](subsampling=subsampling)
+            except (ImportError, RuntimeError, OSError) as e:
+                print(f"JPEG encoder '{preference}' unavailable ({e}), picking automatically")
+
+    encoders = available_encoders(subsampling)
+    if len(encoders) == 1:
+        return encoders[0]
+    frame = _sample_frame(sample_size)
+    timings = {encoder.name: benchmark_encoder(encoder, frame, quality) for encoder in encoders}
+    best = min(encoders, key=lambda encoder: timings[encoder.name])
+    print(f"JPEG encoder: {best.name} ({', '.join(f'{n} {ms:.2f} ms' for n, ms in timings.items())})")
+    return best
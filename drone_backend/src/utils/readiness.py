@@ -0,0 +1,36 @@
+"""
+Startup readiness of the backend components.
+
+The server starts answering before the drone controller, pose model and
+warm-up are done; each step records its status here and /api/ready
+reports it so clients can wait instead of hitting a cold model.
+"""
+
+import threading
+import time
+
+COMPONENTS = ('drone', 'detector', 'warmup', 'stream_encoder', 'llm_tuner')
+
+_started = time.time()
+_lock = threading.Lock()
+_components = {name: {'status': 'pending'} for name in COMPONENTS}
+
+
+def set_status(component, status, **details):
+    """Record a component as 'pending', 'loading', 'ready' or 'failed'"""
+    with _lock:
+        _components[component] = {
+            'status': status,
+            'since': round(time.time() - _started, 3),
+            **details,
+        }
+
+
+def get_readiness():
+    with _lock:
+        components = {name: dict(state) for name, state in _components.items()}
+    return {
+        'ready': all(state['status'] == 'ready' for state in components.values()),
+        'uptime': round(time.time() - _started, 3),
+        'components': components,
+    }
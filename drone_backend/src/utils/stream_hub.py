@@ -0,0 +1,279 @@
+"""
+Encode-once MJPEG broadcast for the tracking stream.
+
+The detection loop publishes each rendered frame into a FrameRing, which
+hands back its sequence number. Size and quality pick a variant, and every
+client on the same variant shares its encodes. When a frame is published
+and some client of a variant is waiting, the variant is queued on a small
+worker pool. A worker encodes the newest slot straight from its read-only
+view, builds the multipart chunk, and wakes the waiting clients. Encoding
+therefore overlaps with detection instead of running in the tracking loop
+or the response generators. It only happens while someone is waiting, and
+each variant costs at most one encode per frame however many clients it has.
+
+Clients can ask for a lower frame rate, a smaller image or a different
+JPEG quality. A frame-rate cap is paced per client by waiting before asking
+for the next frame. In auto mode a client moves along QUALITY_LADDER based
+on how long its socket writes take. The JPEG backend comes from
+src.utils.jpeg_encoder.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from src.utils.frame_ring import FrameRing
+from src.utils.jpeg_encoder import OpenCVJpegEncoder
+
+# (max_size, quality) steps for auto mode, best first; max_size None keeps the full frame
+QUALITY_LADDER = ((None, 85), (720, 75), (540, 65), (360, 55), (240, 45))
+
+
+class _Variant:
+    """Cached chunk for one (max_size, quality) encoding"""
+
+    def __init__(self, max_size, quality):
+        self.max_size = max_size
+        self.quality = quality
+        self.lock = threading.Lock()
+        self.chunk = None
+        self.chunk_seq = 0
+        self.resized = None
+        self.subscribers = 0
+        self.waiting = 0
+        self.busy = False
+        self.encoded = 0
+
+    @property
+    def name(self):
+        return f"{self.max_size or 'full'}@q{self.quality}"
+
+
+class _AutoQuality:
+    """Steps one client down the ladder when writes are slow and back up when they are fast"""
+
+    def __init__(self, budget, slow_fraction=0.5, fast_fraction=0.2, settle_frames=30):
+        """
+        Args:
+            budget: Seconds available per frame at the client's frame rate
+            slow_fraction: Average write time above this share of the budget steps down
+            fast_fraction: Average write time below this share, for settle_frames, steps up
+            settle_frames: Fast frames needed in a row before stepping up
+        """
+        self.slow = budget * slow_fraction
+        self.fast = budget * fast_fraction
+        self.settle_frames = settle_frames
+        self.level = 0
+        self.avg_write = 0.0
+        self.fast_streak = 0
+
+    def update(self, write_seconds):
+        """Fold in one write time; returns True if the level changed"""
+        self.avg_write += (write_seconds - self.avg_write) * 0.2
+        if self.avg_write > self.slow and self.level < len(QUALITY_LADDER) - 1:
+            self.level += 1
+        elif self.avg_write < self.fast and self.level > 0:
+            self.fast_streak += 1
+            if self.fast_streak < self.settle_frames:
+                return False
+            self.level -= 1
+        else:
+            self.fast_streak = 0
+            return False
+        # Start the new level from a neutral average so one step does not trigger the next
+        self.fast_streak = 0
+        self.avg_write = (self.fast + self.slow) / 2
+        return True
+
+
+class MjpegBroadcaster:
+    """Shares one JPEG per published frame and variant between all stream clients"""
+
+    def __init__(self, quality=85, boundary=b'frame', ring_slots=4, default_fps=30, encoder=None, workers=2):
+        """
+        Args:
+            quality: JPEG quality for clients that do not ask for one
+            boundary: Multipart boundary, matching the Response mimetype
+            ring_slots: Frames kept in the handoff ring
+            default_fps: Frame rate assumed by auto mode when the client sets none
+            encoder: JPEG backend from src.utils.jpeg_encoder; OpenCV if None
+            workers: Encoder threads; variants encode in parallel, one frame at a time each
+        """
+        self.quality = quality
+        self.boundary = boundary
+        self.default_fps = default_fps
+        self.encoder = encoder or OpenCVJpegEncoder()
+        self.workers = workers
+        self.ring = FrameRing(ring_slots)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jpeg-encode')
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._variants = {}
+        self.subscribers = 0
+        self.stats = {'published': 0, 'skipped_idle': 0, 'encoded': 0, 'sent': 0, 'encode_failures': 0,
+                      'auto_changes': 0, 'avg_encode_ms': 0.0}
+
+    def set_encoder(self, encoder):
+        """Swap the JPEG backend; jobs already running finish with the old one"""
+        self.encoder = encoder
+
+    def publish(self, frame):
+        """Copy frame into the ring and queue encodes for waiting clients; the caller may reuse frame"""
+        if not self.has_subscribers():
+            self.stats['skipped_idle'] += 1
+            return
+        seq = self.ring.write(frame)
+        with self._cond:
+            self._seq = seq
+            self.stats['published'] += 1
+            for variant in self._variants.values():
+                if variant.waiting:
+                    self._schedule(variant)
+
+    def has_subscribers(self):
+        return self.subscribers > 0
+
+    def _join(self, max_size, quality):
+        with self._cond:
+            variant = self._variants.get((max_size, quality))
+            if variant is None:
+                variant = self._variants[(max_size, quality)] = _Variant(max_size, quality)
+            variant.subscribers += 1
+            return variant
+
+    def _leave(self, variant):
+        with self._cond:
+            variant.subscribers -= 1
+            if variant.subscribers == 0:
+                del self._variants[(variant.max_size, variant.quality)]
+
+    def _resize(self, variant, view):
+        h, w = view.shape[:2]
+        if variant.max_size is None or max(h, w) <= variant.max_size:
+            return view
+        scale = variant.max_size / max(h, w)
+        size = (max(int(w * scale), 1), max(int(h * scale), 1))
+        # Reuse the variant's buffer while the frame size stays the same
+        if variant.resized is not None and variant.resized.shape[1::-1] != size:
+            variant.resized = None
+        variant.resized = cv2.resize(view, size, dst=variant.resized, interpolation=cv2.INTER_AREA)
+        return variant.resized
+
+    def _schedule(self, variant):
+        """Queue an encode of the newest frame for variant; called with the condition held"""
+        if not variant.busy:
+            variant.busy = True
+            self._pool.submit(self._encode, variant)
+
+    def _encode(self, variant):
+        """Pool job: encode the newest frame until variant is current or nobody is waiting"""
+        while True:
+            with self._cond:
+                seq = self._seq
+                if seq <= variant.chunk_seq or not variant.waiting:
+                    variant.busy = False
+                    return
+            entry = self.ring.read(seq)
+            if entry is None:
+                continue  # lapped already; go again with the newer frame
+            started = time.perf_counter()
+            try:
+                data = self.encoder.encode(self._resize(variant, entry[1]), variant.quality)
+            except Exception as e:
+                print(f'JPEG encode failed: {e}')
+                data = None
+            if not self.ring.is_intact(seq):
+                continue  # the writer reused the slot mid-encode
+            encode_ms = (time.perf_counter() - started) * 1000
+
+            with self._cond:
+                if data is None:
+                    self.stats['encode_failures'] += 1
+                    variant.busy = False
+                    return
+                variant.chunk = (b'--' + self.boundary + b'\r\n'
+                                 b'Content-Type: image/jpeg\r\n\r\n' + data + b'\r\n')
+                variant.chunk_seq = seq
+                variant.encoded += 1
+                self.stats['encoded'] += 1
+                self.stats['avg_encode_ms'] += (encode_ms - self.stats['avg_encode_ms']) * 0.1
+                self._cond.notify_all()
+
+    def _wait_chunk(self, variant, last_seq, timeout):
+        """(seq, chunk) newer than last_seq and no older than the newest frame, or None on timeout"""
+        with self._cond:
+            target = max(last_seq + 1, self._seq)
+            variant.waiting += 1
+            try:
+                if variant.chunk_seq < target <= self._seq:
+                    self._schedule(variant)
+                while variant.chunk_seq < target:
+                    if not self._cond.wait(timeout):
+                        return None
+            finally:
+                variant.waiting -= 1
+            return variant.chunk_seq, variant.chunk
+
+    def stream(self, stop_flag=None, timeout=1.0, fps=None, max_size=None, quality=None, auto=False):
+        """
+        Generator of multipart chunks for one client; yields at most once per new frame
+
+        Args:
+            fps: Highest frame rate to send; None sends every frame
+            max_size: Longest image side in pixels; None keeps the full frame
+            quality: JPEG quality; defaults to the broadcaster's
+            auto: Pick size and quality from QUALITY_LADDER by measured write time,
+                ignoring max_size and quality
+        """
+        interval = 1.0 / fps if fps else 0.0
+        controller = _AutoQuality(1.0 / (fps or self.default_fps)) if auto else None
+        if controller is not None:
+            max_size, quality = QUALITY_LADDER[controller.level]
+        elif quality is None:
+            quality = self.quality
+
+        with self._cond:
+            self.subscribers += 1
+        variant = self._join(max_size, quality)
+        last_seq = 0
+        next_due = 0.0
+        try:
+            while not (stop_flag is not None and stop_flag.is_set()):
+                if interval:
+                    now = time.perf_counter()
+                    if next_due > now:
+                        time.sleep(next_due - now)
+                    next_due = max(next_due, now) + interval
+
+                result = self._wait_chunk(variant, last_seq, timeout)
+                if result is None:
+                    continue
+                last_seq, chunk = result
+                self.stats['sent'] += 1
+                # The server writes the chunk to the socket before resuming the generator
+                started = time.perf_counter()
+                yield chunk
+                if controller is not None and controller.update(time.perf_counter() - started):
+                    self.stats['auto_changes'] += 1
+                    self._leave(variant)
+                    variant = self._join(*QUALITY_LADDER[controller.level])
+        finally:
+            # Runs when the client disconnects and Flask closes the generator
+            self._leave(variant)
+            with self._cond:
+                self.subscribers -= 1
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats['subscribers'] = self.subscribers
+            stats['variants'] = {v.name: {'subscribers': v.subscribers, 'encoded': v.encoded}
+                                 for v in self._variants.values()}
+        stats['encoder'] = self.encoder.name
+        stats['workers'] = self.workers
+        stats['avg_encode_ms'] = round(stats['avg_encode_ms'], 2)
+        stats['ring'] = self.ring.get_stats()
+        stats['encodes_per_send'] = round(stats['encoded'] / stats['sent'], 3) if stats['sent'] else None
+        return stats